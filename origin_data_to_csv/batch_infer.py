@@ -0,0 +1,198 @@
+# 多床位批量推理：每张床一路雷达数据流，各自维护滑动窗口；
+# 窗口就绪后不马上推理，而是放进共享的等待队列，由调度线程凑成一批做一次前向。
+# 凑满 max_batch 个，或者队列里最早的窗口已经等了 max_delay 秒，就立即发出这一批，
+# 所以单个窗口的额外排队延迟不会超过 max_delay。
+# 每路最多只有一个窗口在等待：前向跟不上各路的总帧率时，新窗口覆盖同一路还没推理的旧窗口并计数，
+# 队列长度不超过床位数，排队时间和内存不会无限增长。
+#
+# 用法：python batch_infer.py 模型checkpoint 数据源1 数据源2 ... [--delay 毫秒] [--batch 最大批大小]
+#   数据源与 stream_infer.py 相同（串口名、tcp://host:port 或 .pcr 文件），每个数据源当作一张床
+import sys
+import time
+import threading
+from collections import Counter, deque
+from itertools import islice
+import numpy as np
+import torch
+from model import load_checkpoint
+from stream_infer import FALL_CLASS, InferenceResult, FrameWindow, input_view, open_source
+
+
+class BatchScheduler:
+    def __init__(self, model, params, window=1, hop=1, max_batch=16, max_delay=0.02, on_result=None):
+        self.model = model.to('cpu').eval()
+        self.params = params
+        self.window = window
+        self.hop = hop
+        self.max_batch = max_batch
+        self.max_delay = max_delay  # 允许窗口在队列里等待的最长时间（秒）
+        self.on_result = on_result  # 调度线程里对每个结果调用 on_result(stream_id, result)
+
+        self._streams = {}
+        # stream_id -> (timestamp, frame_index, 排队开始时间, 入队时间, 窗口数据)，按排队开始的先后排列；
+        # 同一路的新窗口覆盖旧窗口时保留排队开始时间和位置，等待期限不会被推后
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        # 预先分配的批输入 (max_batch, 5, window * max_points)
+        self._input = torch.zeros((max_batch, 5, window * params['max_points']), dtype=torch.float32)
+        self._window_views = input_view(self._input, window, params['max_points'])
+
+        self.batch_sizes = Counter()
+        self.queue_times = deque(maxlen=5000)
+        self.latencies = deque(maxlen=5000)
+        self.model_times = deque(maxlen=1000)
+        self.windows_done = 0
+        self.windows_replaced = 0  # 还没推理就被同一路的新窗口覆盖掉的窗口数
+        self._start_time = None
+
+    def start(self):
+        self._start_time = time.time()
+        self._thread = threading.Thread(target=self._run, name='batch-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """处理完已经在队列里的窗口后返回"""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, stream_id, timestamp, frame_index, points):
+        """送入某一路的一帧，可以在各路自己的线程里调用"""
+        frames = self._streams.get(stream_id)
+        if frames is None:
+            frames = self._streams[stream_id] = FrameWindow(self.params, self.window, self.hop)
+        if not frames.push(points):
+            return
+        window_data = np.empty((self.window, self.params['max_points'], 5), dtype=np.float32)
+        frames.copy_into(window_data)
+        enqueue_time = time.perf_counter()
+        with self._cond:
+            previous = self._pending.get(stream_id)
+            if previous is not None:
+                self.windows_replaced += 1
+                self._pending[stream_id] = (timestamp, frame_index, previous[2], enqueue_time, window_data)
+                return
+            self._pending[stream_id] = (timestamp, frame_index, enqueue_time, enqueue_time, window_data)
+            # 第一个窗口到达时调度线程要开始计时，凑满一批时要立即发出
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+
+    def _next_batch(self):
+        """等到凑满一批或最早的窗口到了等待期限，取出一批；停止且队列为空时返回 None"""
+        with self._cond:
+            while True:
+                if len(self._pending) >= self.max_batch:
+                    break
+                if self._pending:
+                    remaining = next(iter(self._pending.values()))[2] + self.max_delay - time.perf_counter()
+                    if remaining <= 0 or self._stop_event.is_set():
+                        break
+                    self._cond.wait(remaining)
+                elif self._stop_event.is_set():
+                    return None
+                else:
+                    self._cond.wait()
+            stream_ids = list(islice(self._pending, self.max_batch))
+            return [(stream_id,) + self._pending.pop(stream_id) for stream_id in stream_ids]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            n = len(batch)
+            dispatch_time = time.perf_counter()
+            for i, (_, _, _, _, _, window_data) in enumerate(batch):
+                self._window_views[i] = window_data
+
+            with torch.inference_mode():
+                fall_probs = torch.softmax(self.model(self._input[:n]), dim=1)[:, FALL_CLASS].tolist()
+            model_time = time.perf_counter() - dispatch_time
+            now = time.time()
+
+            self.batch_sizes[n] += 1
+            self.model_times.append(model_time)
+            self.windows_done += n
+            for (stream_id, timestamp, frame_index, _, enqueue_time, _), fall_prob in zip(batch, fall_probs):
+                self.queue_times.append(dispatch_time - enqueue_time)
+                result = InferenceResult(timestamp, frame_index, fall_prob, now - timestamp, model_time)
+                self.latencies.append(result.latency)
+                if self.on_result is not None:
+                    self.on_result(stream_id, result)
+
+    def stats(self):
+        """批大小分布、排队时间、端到端延迟（毫秒）和吞吐量（窗口/秒）"""
+        elapsed = time.time() - self._start_time if self._start_time else 0.0
+        batches = sum(self.batch_sizes.values())
+        stats = {
+            'batches': batches,
+            'windows': self.windows_done,
+            'mean_batch': self.windows_done / batches if batches else 0.0,
+            'batch_sizes': dict(sorted(self.batch_sizes.items())),
+            'pending': len(self._pending),
+            'replaced': self.windows_replaced,
+            'throughput': self.windows_done / elapsed if elapsed > 0 else 0.0,
+        }
+        if self.queue_times:
+            queue_times = np.array(self.queue_times) * 1000
+            latencies = np.array(self.latencies) * 1000
+            model_times = np.array(self.model_times) * 1000
+            stats.update({
+                'queue_p50': float(np.percentile(queue_times, 50)),
+                'queue_p95': float(np.percentile(queue_times, 95)),
+                'latency_p50': float(np.percentile(latencies, 50)),
+                'latency_p95': float(np.percentile(latencies, 95)),
+                'model_p50': float(np.percentile(model_times, 50)),
+            })
+        return stats
+
+
+def feed(scheduler, stream_id, source):
+    """把一个数据源的帧依次送进调度器"""
+    for timestamp, frame_index, points in open_source(source):
+        scheduler.submit(stream_id, timestamp, frame_index, points)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    max_delay = 0.02
+    max_batch = 16
+    if '--delay' in args:
+        i = args.index('--delay')
+        max_delay = float(args[i + 1]) / 1000
+        del args[i:i + 2]
+    if '--batch' in args:
+        i = args.index('--batch')
+        max_batch = int(args[i + 1])
+        del args[i:i + 2]
+    checkpoint_path, sources = args[0], args[1:]
+    threshold = 0.5
+
+    def on_result(stream_id, result):
+        if result.fall_prob >= threshold:
+            print(f"[床位 {stream_id}] Frame #{result.frame_index}: fall={result.fall_prob:.3f}  <-- 坠床")
+
+    torch.set_num_threads(1)
+    model, params, window = load_checkpoint(checkpoint_path)
+    scheduler = BatchScheduler(model, params, window, max_batch=max_batch, max_delay=max_delay,
+                               on_result=on_result)
+    scheduler.start()
+    feeders = [threading.Thread(target=feed, args=(scheduler, i, source), daemon=True)
+               for i, source in enumerate(sources)]
+    for feeder in feeders:
+        feeder.start()
+
+    try:
+        while any(feeder.is_alive() for feeder in feeders):
+            time.sleep(2)
+            print(scheduler.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+        print(scheduler.stats())
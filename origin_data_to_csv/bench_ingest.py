@@ -0,0 +1,45 @@
+# 测试 RadarDataset 多进程加载的速度：不同进程数下冷启动（无缓存）的 文件/秒 和 帧/秒。
+# 用法：python bench_ingest.py [数据目录] [文件列表txt]
+import os
+import sys
+import time
+import shutil
+import tempfile
+from preprocess import load_sessions, gather_sessions, DEFAULT_PARAMS as PARAMS
+
+DATA_DIR = './fall_bed_data3'
+
+
+def list_files(data_dir, data_txt=None):
+    if data_txt is not None:
+        names = [line.strip() for line in open(data_txt, 'r') if line.strip()]
+    else:
+        names = sorted(f for f in os.listdir(data_dir) if f.endswith(('.csv', '.pcr')))
+    return [os.path.join(data_dir, name) for name in names]
+
+
+def bench(file_paths, num_workers):
+    # 每次用一个新的空缓存目录，测的是真正解析文件的速度
+    cache_dir = tempfile.mkdtemp(prefix='radar_bench_')
+    try:
+        start = time.perf_counter()
+        sessions = load_sessions(file_paths, PARAMS, cache_dir, num_workers)
+        data, _ = gather_sessions(sessions, PARAMS['max_points'])
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return elapsed, len(data)
+
+
+if __name__ == '__main__':
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else DATA_DIR
+    data_txt = sys.argv[2] if len(sys.argv) > 2 else None
+    file_paths = list_files(data_dir, data_txt)
+
+    cpu_count = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, 8, cpu_count} & set(range(1, cpu_count + 1)))
+    print(f"{len(file_paths)} 个文件, CPU 核数 {cpu_count}")
+    print(f"{'进程数':>6} {'耗时(s)':>8} {'文件/秒':>8} {'帧/秒':>10}")
+    for num_workers in worker_counts:
+        elapsed, frame_count = bench(file_paths, num_workers)
+        print(f"{num_workers:>6} {elapsed:>8.2f} {len(file_paths) / elapsed:>8.1f} {frame_count / elapsed:>10.0f}")
@@ -1,86 +1,74 @@
 import sys
-import serial
 import time
-import csv
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLineEdit, QLabel,
                              QMessageBox, QDesktopWidget)
 from PyQt5.QtCore import QThread, pyqtSignal, Qt
 from PyQt5.QtGui import QFont
+from serial_pipeline import RecordingPipeline, LatestFrame
+from live_view import LivePointCloudWindow
 
 class RecordingThread(QThread):
-    update_signal = pyqtSignal(str)
+    stats_signal = pyqtSignal(dict)
     error_signal = pyqtSignal(str)
     finished_signal = pyqtSignal()
 
-    def __init__(self, com_port, baud_rate, file_path):
+    def __init__(self, com_port, baud_rate, file_path, status_interval=500, frame_slot=None):
         super().__init__()
         self.com_port = com_port
         self.baud_rate = baud_rate
         self.file_path = file_path
+        self.status_interval = status_interval  # 向界面汇报统计信息的间隔（毫秒）
+        self.frame_slot = frame_slot  # 不为 None 时每帧写入这个 LatestFrame，供实时显示
         self._is_running = True
 
     def stop(self):
         self._is_running = False
 
-    def process_raw_line(self, line):
-        raw_frame = [x.strip() for x in line.strip().split(',') if x.strip() != '']
-
-        if len(raw_frame) < 2:
-            return []
-
-        try:
-            frame_index = int(raw_frame[0])
-            point_num = int(raw_frame[1])
-        except ValueError:
-            return []
-
-        data = raw_frame[2:]
-        if len(data) < point_num * 5:
-            return []
-
-        frame = []
-        for i in range(point_num):
-            try:
-                point_item = [int(data[5 * i + j]) for j in range(5)]
-                frame.append(point_item)
-            except (ValueError, IndexError):
-                continue
-        return frame
+    def wait_interval(self, pipeline):
+        """分小段睡眠，stop() 或流水线出错后能尽快返回"""
+        deadline = time.time() + self.status_interval / 1000.0
+        while self._is_running and pipeline.error is None and time.time() < deadline:
+            self.msleep(50)
 
     def run(self):
+        # 读串口、解析、写文件都在 RecordingPipeline 的线程里完成，
+        # 这里按 status_interval 汇总一次统计信息发给界面，界面刷新频率与帧率无关
+        pipeline = RecordingPipeline(self.com_port, self.baud_rate, self.file_path)
+        if self.frame_slot is not None:
+            pipeline.frame_callbacks.append(self.frame_slot.put)
         try:
-            ser = serial.Serial(self.com_port, self.baud_rate, timeout=1)
-            with open(self.file_path, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(['timeForPointcloud', 'frameInfo', 'total_point_num'])
-
-                while self._is_running:
-                    line = ser.readline().decode('utf-8').strip()
-                    if line:
-                        timestamp = time.time()
-                        time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
-                        millis = int((timestamp - int(timestamp)) * 1000)
-                        time_str = f"{time_str}.{millis:03d}"
-
-                        frame = self.process_raw_line(line)
-                        total_point_num = len(frame)
-
-                        status = f'Time: {time_str}, Points: {total_point_num}'
-                        self.update_signal.emit(status)
-
-                        writer.writerow([time_str, str(frame), str(total_point_num)])
-            ser.close()
+            pipeline.start()
+            last_stats = pipeline.stats()
+            last_time = time.time()
+            while self._is_running and pipeline.error is None:
+                self.wait_interval(pipeline)
+                stats = pipeline.stats()
+                now = time.time()
+                elapsed = max(now - last_time, 1e-6)
+                stats['fps'] = (stats['frames_parsed'] - last_stats['frames_parsed']) / elapsed
+                stats['pps'] = (stats['points_parsed'] - last_stats['points_parsed']) / elapsed
+                stats['dropped'] = stats['ring_overflow'] + stats['frames_dropped']
+                self.stats_signal.emit(stats)
+                last_stats, last_time = stats, now
+            pipeline.stop()
+            if pipeline.error is not None:
+                raise pipeline.error
         except Exception as e:
             self.error_signal.emit(str(e))
         finally:
+            pipeline.stop()
             self.finished_signal.emit()
 
 
 class RadarRecorderGUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, com_port='COM30', status_interval=500):
         super().__init__()
+        self.com_port = com_port  # 串口名，或 serial_hub 的 hub://host:port
         self.recording_thread = None
+        self.status_interval = status_interval  # 录制状态的刷新间隔（毫秒）
+        self.frame_slot = LatestFrame()  # 录制线程写入最新一帧，实时显示窗口从这里取
+        self.live_window = None
         self.initUI()
         self.record_count = 1
         self.setup_styles()
@@ -135,17 +123,20 @@ class RadarRecorderGUI(QMainWindow):
         self.start_btn = QPushButton('开始录制')
         self.stop_btn = QPushButton('停止录制')
         self.stop_btn.setEnabled(False)
+        self.live_btn = QPushButton('实时显示')
 
         # 设置按钮尺寸和字体
-        for btn in [self.start_btn, self.stop_btn]:
+        for btn in [self.start_btn, self.stop_btn, self.live_btn]:
             btn.setMinimumSize(200, 50)  # 最小宽度200，高度50
             btn.setFont(font)
 
         self.start_btn.clicked.connect(self.start_recording)
         self.stop_btn.clicked.connect(self.stop_recording)
+        self.live_btn.clicked.connect(self.show_live_view)
 
         btn_layout.addWidget(self.start_btn)
         btn_layout.addWidget(self.stop_btn)
+        btn_layout.addWidget(self.live_btn)
         layout.addLayout(btn_layout)
 
         # 状态栏
@@ -193,7 +184,7 @@ class RadarRecorderGUI(QMainWindow):
         millis = int((timestamp - int(timestamp)) * 1000)
         username = self.username_input.text().strip().replace(' ', '_')
         action = self.action_input.text().strip().replace(' ', '_')
-        return f'./fall_bed_data3/pointCloud_{time_str}.{millis:03d}_{username}_{action}_count{self.record_count}.csv'
+        return f'./fall_bed_data3/pointCloud_{time_str}.{millis:03d}_{username}_{action}_count{self.record_count}.pcr'
 
     def start_recording(self):
         if not self.validate_inputs():
@@ -201,12 +192,14 @@ class RadarRecorderGUI(QMainWindow):
 
         file_path = self.generate_filename()
         self.recording_thread = RecordingThread(
-            com_port='COM30',
+            com_port=self.com_port,
             baud_rate=921600,
-            file_path=file_path
+            file_path=file_path,
+            status_interval=self.status_interval,
+            frame_slot=self.frame_slot
         )
 
-        self.recording_thread.update_signal.connect(self.update_status)
+        self.recording_thread.stats_signal.connect(self.update_status)
         self.recording_thread.error_signal.connect(self.show_error)
         self.recording_thread.finished_signal.connect(self.recording_finished)
 
@@ -224,13 +217,23 @@ class RadarRecorderGUI(QMainWindow):
             self.recording_thread.stop()
             self.recording_thread.wait()
 
+    def show_live_view(self):
+        if self.live_window is None:
+            self.live_window = LivePointCloudWindow(self.frame_slot)
+        self.live_window.show()
+        self.live_window.raise_()
+
     def recording_finished(self):
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.status_label.setText(f'Recording Stopped - Data Saved (Total: {self.record_count - 1})')
 
-    def update_status(self, message):
-        self.status_label.setText(message)
+    def update_status(self, stats):
+        message = (f'{stats["fps"]:.1f} frames/s, {stats["pps"]:.0f} points/s\n'
+                   f'Frames: {stats["frames_written"]}, Written: {stats["bytes_written"] / 1024:.0f} KB\n'
+                   f'Dropped: {stats["dropped"]}, Parse errors: {stats["parse_errors"]}')
+        if message != self.status_label.text():
+            self.status_label.setText(message)
 
     def show_error(self, message):
         QMessageBox.critical(self, 'Error', message)
@@ -240,11 +243,14 @@ class RadarRecorderGUI(QMainWindow):
         if self.recording_thread and self.recording_thread.isRunning():
             self.recording_thread.stop()
             self.recording_thread.wait()
+        if self.live_window is not None:
+            self.live_window.close()
         event.accept()
 
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    window = RadarRecorderGUI()
+    # 可以传入串口名，或者 hub://127.0.0.1:7790 与其它程序共用 serial_hub.py 打开的串口
+    window = RadarRecorderGUI(sys.argv[1] if len(sys.argv) > 1 else 'COM30')
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
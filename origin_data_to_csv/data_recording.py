@@ -3,7 +3,9 @@
 import serial
 import time
 import csv
+import numpy as np
 from tqdm import tqdm
+from radar_parser import ParseStats, parse_line
 
 BOX_MIN = [-50, 10, -30]
 BOX_MAX = [50, 200, 50]
@@ -20,49 +22,11 @@ BOX_MAX = [50, 200, 50]
 #     return frame
 
 
-def process_raw_line(line):
-    print(line)
-    # 拆分字符串并去掉多余空项（末尾多的逗号可能产生空字符串）
-    raw_frame = [x.strip() for x in line.strip().split(',') if x.strip() != '']
-
-    if len(raw_frame) < 2:
-        print("行数据长度不足，跳过")
-        return []
-
-    try:
-        frame_index = int(raw_frame[0])
-        point_num = int(raw_frame[1])
-    except ValueError:
-        print("帧索引或点数解析失败，跳过")
-        return []
-
-    data = raw_frame[2:]
-
-    if len(data) < point_num * 5:
-        print(f"点云数据长度不足：实际={len(data)}，预期={point_num * 5}，跳过")
-        return []
-
-    frame = []
-    for i in range(point_num):
-        try:
-            point_item = [int(data[5 * i + j]) for j in range(5)]
-            frame.append(point_item)
-        except (ValueError, IndexError):
-            print(f"第 {i} 个点数据有误，跳过：{data[5 * i: 5 * i + 5]}")
-            continue
-
-    return frame
-
-
 def cal_in_out_point_num(frame):
     # 计算每一帧对应在范围内和范围外点的数量
-    in_point_num = 0
-    out_point_num = 0
-    for i in range(len(frame)):
-        if frame[i][0] < BOX_MAX[0] and frame[i][1] < BOX_MAX[1] and frame[i][2] < BOX_MAX[2]:
-            in_point_num += 1
-        else:
-            out_point_num += 1
+    inside = np.all(frame[:, :3] < BOX_MAX, axis=1)
+    in_point_num = int(inside.sum())
+    out_point_num = len(frame) - in_point_num
     return in_point_num, out_point_num
 
 
@@ -70,6 +34,7 @@ def cal_in_out_point_num(frame):
 def recording_data(com_port, baud_rate, num_frame, file_path):
     # 打开串口
     ser = serial.Serial(com_port, baud_rate, timeout=1)
+    stats = ParseStats()
     
     # 打开 CSV 文件用于写入数据
     with open(file_path, mode='w', newline='') as file:
@@ -82,32 +47,33 @@ def recording_data(com_port, baud_rate, num_frame, file_path):
         if num_frame == 0:
             print("Recording data until the program is stopped...")
             while True:  # 无限循环
-                line = ser.readline().decode('utf-8').strip()  # 读取一行数据并去掉尾部空白字符
-                if line:  # 确保不为空行
+                line = ser.readline()  # 读取一行原始数据
+                parsed = parse_line(line, stats)  # 解析当前行，空行或格式错误时为 None
+                if parsed is not None:
                     # 获取当前时间戳
                     time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
                     
-                    # 处理当前行，解析点云数据
-                    frame = process_raw_line(line)
+                    frame_index, frame = parsed
                     in_point_num, out_point_num = cal_in_out_point_num(frame)
                     
                     # 将时间戳和点云数据保存为 CSV 格式
-                    print(f'Time: {time_str}, In point num: {in_point_num}, Out point num: {out_point_num}')
-                    writer.writerow([time_str, str(frame), str(in_point_num), str(out_point_num)])
+                    print(f'Time: {time_str}, In point num: {in_point_num}, Out point num: {out_point_num}, '
+                          f'Parse errors: {stats.malformed}')
+                    writer.writerow([time_str, str(frame.tolist()), str(in_point_num), str(out_point_num)])
         else:
             # 使用 tqdm 显示进度条
             for _ in tqdm(range(num_frame), desc="Recording Data", unit="frame"):
-                line = ser.readline().decode('utf-8').strip()  # 读取一行数据并去掉尾部空白字符
-                if line:  # 确保不为空行
+                line = ser.readline()  # 读取一行原始数据
+                parsed = parse_line(line, stats)  # 解析当前行，空行或格式错误时为 None
+                if parsed is not None:
                     # 获取当前时间戳
                     time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
                     
-                    # 处理当前行，解析点云数据
-                    frame = process_raw_line(line)
+                    frame_index, frame = parsed
                     in_point_num, out_point_num = cal_in_out_point_num(frame)
                     
                     # 将时间戳和点云数据保存为 CSV 格式
-                    writer.writerow([time_str, str(frame), str(in_point_num), str(out_point_num)])
+                    writer.writerow([time_str, str(frame.tolist()), str(in_point_num), str(out_point_num)])
     # 关闭串口
     ser.close()
 
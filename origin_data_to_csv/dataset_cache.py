@@ -0,0 +1,55 @@
+# RadarDataset 预处理结果的磁盘缓存。
+#
+# 每个录制文件预处理（标准化 + 填充/截断）后的 (帧数, max_points, 5) float32 数组存成一个 .npy，
+# 文件名里带上由 源文件路径 + mtime + 大小 + 预处理参数 计算出的哈希，
+# 源文件被修改或参数变化时哈希不同，自然会重新生成；再次运行时直接 mmap 读取。
+import os
+import json
+import hashlib
+import numpy as np
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = '.radar_cache'
+
+
+def cache_key(file_path, params):
+    """根据源文件的路径、修改时间、大小和预处理参数计算缓存键"""
+    stat = os.stat(file_path)
+    key = {
+        'version': CACHE_VERSION,
+        'path': os.path.realpath(file_path),
+        'mtime': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'params': params,
+    }
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class SessionCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def cache_path(self, file_path, params):
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        return os.path.join(self.cache_dir, f"{name}_{cache_key(file_path, params)[:16]}.npy")
+
+    def load(self, file_path, params):
+        """返回 mmap 方式打开的缓存数组，没有缓存时返回 None"""
+        path = self.cache_path(file_path, params)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, mmap_mode='r')
+        except (ValueError, OSError):
+            # 缓存文件损坏（例如写入时被中断），当作没有缓存
+            return None
+
+    def save(self, file_path, params, array):
+        """写入缓存并返回 mmap 方式打开的数组。先写临时文件再改名，避免留下半截的缓存"""
+        path = self.cache_path(file_path, params)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            np.save(file, np.ascontiguousarray(array, dtype=np.float32))
+        os.replace(tmp_path, path)
+        return np.load(path, mmap_mode='r')
@@ -0,0 +1,132 @@
+# 点云密度统计：把点按固定大小的体素网格计数，用于画占用/密度热力图。
+#
+# DensityGrid.add / remove 每次只处理一帧的点（np.bincount 一次计数），
+# 播放时维护最近 N 帧的滑动窗口只需要加入新帧、减去最旧的一帧，不用每帧重新统计。
+#
+# 用法：python density.py 录制文件1 录制文件2 ... [--out heatmap.png]
+#   把多个录制文件的所有点累积到同一个网格里，保存 XY 平面的密度热力图
+import sys
+from collections import deque
+import numpy as np
+from pointcloud_io import open_recording
+
+# 与显示范围一致（单位与原始数据相同）
+DEFAULT_BOUNDS = ((-500, 800), (-500, 800), (-200, 200))
+DEFAULT_CELL = 25
+
+
+class DensityGrid:
+    def __init__(self, bounds=DEFAULT_BOUNDS, cell=DEFAULT_CELL):
+        self.lower = np.array([low for low, _ in bounds], dtype=np.float32)
+        self.cell = cell
+        self.shape = tuple(int(np.ceil((high - low) / cell)) for low, high in bounds)
+        self.counts = np.zeros(self.shape, dtype=np.int32)
+        self.total = 0  # 网格内的点数
+
+    @property
+    def extent(self):
+        """XY 平面热力图在 imshow 里的范围 (left, right, bottom, top)"""
+        upper = self.lower + np.array(self.shape) * self.cell
+        return self.lower[0], upper[0], self.lower[1], upper[1]
+
+    def _bin(self, points):
+        """每个点所在体素的一维下标，网格外的点丢掉"""
+        cells = np.floor((points[:, :3] - self.lower) / self.cell).astype(np.int64)
+        inside = np.all((cells >= 0) & (cells < self.shape), axis=1)
+        return np.ravel_multi_index(cells[inside].T, self.shape)
+
+    def add(self, points):
+        index = self._bin(points)
+        self.counts += np.bincount(index, minlength=self.counts.size).reshape(self.shape)
+        self.total += len(index)
+
+    def remove(self, points):
+        """减去之前 add 过的一帧"""
+        index = self._bin(points)
+        self.counts -= np.bincount(index, minlength=self.counts.size).reshape(self.shape)
+        self.total -= len(index)
+
+    def clear(self):
+        self.counts[:] = 0
+        self.total = 0
+
+    def xy(self):
+        """沿 Z 方向求和的 XY 密度，(ny, nx)，可以直接给 imshow(origin='lower')"""
+        return self.counts.sum(axis=2).T
+
+
+class TrailWindow:
+    """录制文件里最近 length 帧的点和密度，顺序播放时增量更新，跳转时重建"""
+
+    def __init__(self, recording, length=50, bounds=DEFAULT_BOUNDS, cell=DEFAULT_CELL):
+        self.recording = recording
+        self.length = length
+        self.grid = DensityGrid(bounds, cell)
+        self.frames = deque()  # (帧序号, 点)
+        self._points = None
+
+    def move_to(self, frame_idx):
+        """让窗口覆盖 [frame_idx - length + 1, frame_idx] 这些帧"""
+        start = max(frame_idx - self.length + 1, 0)
+        if self.frames and self.frames[-1][0] + 1 == frame_idx and self.frames[0][0] <= start:
+            # 顺序播放：加入新的一帧，去掉滑出窗口的帧
+            points = self.recording.frame(frame_idx)
+            self.frames.append((frame_idx, points))
+            self.grid.add(points)
+            while self.frames[0][0] < start:
+                self.grid.remove(self.frames.popleft()[1])
+        elif not self.frames or self.frames[-1][0] != frame_idx:
+            self.grid.clear()
+            self.frames.clear()
+            for i in range(start, frame_idx + 1):
+                points = self.recording.frame(i)
+                self.frames.append((i, points))
+                self.grid.add(points)
+        self._points = None
+
+    def set_length(self, length):
+        self.length = length
+        if self.frames:
+            frame_idx = self.frames[-1][0]
+            self.frames.clear()
+            self.move_to(frame_idx)
+
+    @property
+    def points(self):
+        """窗口内所有帧的点拼在一起，用来画轨迹"""
+        if self._points is None:
+            frames = [points for _, points in self.frames]
+            self._points = np.concatenate(frames) if frames else np.empty((0, 5), dtype=np.int16)
+        return self._points
+
+
+def accumulate(file_paths, bounds=DEFAULT_BOUNDS, cell=DEFAULT_CELL):
+    """把多个录制文件的所有点累积到一个网格里"""
+    grid = DensityGrid(bounds, cell)
+    for file_path in file_paths:
+        recording = open_recording(file_path)
+        for i in range(len(recording)):
+            grid.add(recording.frame(i))
+    return grid
+
+
+if __name__ == '__main__':
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    args = sys.argv[1:]
+    out_path = 'heatmap.png'
+    if '--out' in args:
+        i = args.index('--out')
+        out_path = args[i + 1]
+        del args[i:i + 2]
+    grid = accumulate(args)
+    fig, ax = plt.subplots(figsize=(7, 6))
+    image = ax.imshow(np.log1p(grid.xy()), origin='lower', extent=grid.extent, cmap='inferno')
+    fig.colorbar(image, ax=ax, label='log(1 + 点数)')
+    ax.set_xlabel("X")
+    ax.set_ylabel("Y")
+    ax.set_title(f"{len(args)} 个文件, {grid.total} 个点")
+    fig.savefig(out_path, dpi=120)
+    print(f"已保存到 {out_path}")
@@ -0,0 +1,152 @@
+# 把 model.py 里的三个模型导出成 TorchScript（以及动态 int8 量化版本），给床边的边缘盒子用。
+#
+#   script：torch.jit.script + freeze + optimize_for_inference，权重折叠成常量，不依赖 Python 源码
+#   int8：对 Linear / GRU 做动态 int8 量化后再 script + freeze。卷积层动态量化不支持，仍是 float32
+#
+# 导出后在录制好的数据上逐窗口对比导出模型和原模型的输出（坠床概率的最大误差、预测类别一致率），
+# 并测试 batch=1 时的单样本延迟和模型大小。
+#
+# 用法：python export_models.py [模型名称或checkpoint ...] --data 录制文件1 录制文件2 ... [--out 导出目录]
+#   不给模型时导出三个未训练的模型（只用来比较速度）
+import os
+import io
+import sys
+import json
+import time
+import warnings
+import numpy as np
+import torch
+from model import MODELS, SCRIPT_SUFFIX, load_checkpoint
+from preprocess import load_session, DEFAULT_PARAMS
+from stream_infer import FALL_CLASS
+
+VARIANTS = ('eager', 'script', 'int8')
+DEFAULT_OUT_DIR = 'exported'
+
+
+def script_model(model):
+    scripted = torch.jit.freeze(torch.jit.script(model.eval()))
+    return torch.jit.optimize_for_inference(scripted)
+
+
+def quantize_model(model):
+    with warnings.catch_warnings():
+        # torch.ao.quantization 提示迁移到 torchao，这里只用到动态量化，忽略
+        warnings.simplefilter('ignore')
+        quantized = torch.ao.quantization.quantize_dynamic(
+            model.eval(), {torch.nn.Linear, torch.nn.GRU}, dtype=torch.qint8)
+        return torch.jit.freeze(torch.jit.script(quantized))
+
+
+def build_variants(model):
+    """返回 {变体名称: 模型}"""
+    return {
+        'eager': model.eval(),
+        'script': script_model(model),
+        'int8': quantize_model(model),
+    }
+
+
+def save_variant(module, path, name, params, window):
+    """保存导出的模型，预处理参数和窗口长度写进文件里，load_checkpoint 可以直接加载"""
+    meta = json.dumps({'model': name, 'params': params, 'window': window})
+    torch.jit.save(module, path, _extra_files={'meta.json': meta})
+
+
+def model_size(module):
+    """序列化后的字节数，量化模型的打包权重也算在内"""
+    buffer = io.BytesIO()
+    if isinstance(module, torch.jit.ScriptModule):
+        torch.jit.save(module, buffer)
+    else:
+        torch.save(module.state_dict(), buffer)
+    return buffer.tell()
+
+
+def session_inputs(file_paths, params, window, max_samples=2000):
+    """从录制文件里取出最多 max_samples 个滑动窗口，返回模型输入 (N, 5, window * max_points)"""
+    windows = []
+    for file_path in file_paths:
+        session = load_session(file_path, params)
+        if len(session) < window:
+            continue
+        starts = np.arange(len(session) - window + 1)
+        windows.append(session[starts[:, None] + np.arange(window)])  # (窗口数, window, max_points, 5)
+    if not windows:
+        raise ValueError("录制文件里没有足够的帧")
+    windows = np.concatenate(windows)
+    if len(windows) > max_samples:
+        windows = windows[np.linspace(0, len(windows) - 1, max_samples).astype(np.int64)]
+    inputs = windows.reshape(len(windows), -1, 5).transpose(0, 2, 1)
+    return torch.from_numpy(np.ascontiguousarray(inputs))
+
+
+def check_agreement(reference, candidate, inputs, batch_size=256):
+    """逐批对比两个模型的输出：坠床概率的最大绝对误差和预测类别一致率"""
+    max_diff = 0.0
+    agree = 0
+    with torch.inference_mode():
+        for start in range(0, len(inputs), batch_size):
+            batch = inputs[start:start + batch_size]
+            ref_prob = torch.softmax(reference(batch), dim=1)
+            cand_prob = torch.softmax(candidate(batch), dim=1)
+            max_diff = max(max_diff, (ref_prob[:, FALL_CLASS] - cand_prob[:, FALL_CLASS]).abs().max().item())
+            agree += (ref_prob.argmax(dim=1) == cand_prob.argmax(dim=1)).sum().item()
+    return {'max_prob_diff': max_diff, 'argmax_agree': agree / len(inputs)}
+
+
+def benchmark(module, inputs, runs=500, warmup=50):
+    """batch=1 逐个样本推理的延迟（毫秒）"""
+    times = np.empty(runs)
+    with torch.inference_mode():
+        for i in range(warmup):
+            module(inputs[i % len(inputs)][None])
+        for i in range(runs):
+            sample = inputs[i % len(inputs)][None]
+            start = time.perf_counter()
+            module(sample)
+            times[i] = time.perf_counter() - start
+    times *= 1000
+    return {'p50_ms': float(np.percentile(times, 50)), 'p95_ms': float(np.percentile(times, 95))}
+
+
+def load_model(spec):
+    """spec 为模型名称时创建未训练的模型，否则当作 checkpoint 路径"""
+    if spec in MODELS:
+        return spec, MODELS[spec](num_classes=2), dict(DEFAULT_PARAMS), 1
+    model, params, window = load_checkpoint(spec)
+    return os.path.splitext(os.path.basename(spec))[0], model, params, window
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    out_dir = DEFAULT_OUT_DIR
+    if '--out' in args:
+        i = args.index('--out')
+        out_dir = args[i + 1]
+        del args[i:i + 2]
+    data_files = []
+    if '--data' in args:
+        i = args.index('--data')
+        data_files = args[i + 1:]
+        del args[i:]
+    specs = args or list(MODELS)
+    if not data_files:
+        sys.exit("需要用 --data 指定用来对比输出的录制文件")
+
+    # torch.jit 各接口在新版本里都带 FutureWarning，这里统一忽略
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    torch.set_num_threads(1)
+    os.makedirs(out_dir, exist_ok=True)
+    print(f"{'模型':>10} {'变体':>6} {'大小(KB)':>9} {'p50(ms)':>8} {'p95(ms)':>8} {'概率误差':>9} {'类别一致':>8}")
+    for spec in specs:
+        name, model, params, window = load_model(spec)
+        inputs = session_inputs(data_files, params, window)
+        variants = build_variants(model)
+        for variant, module in variants.items():
+            if variant != 'eager':
+                save_variant(module, os.path.join(out_dir, f"{name}_{variant}{SCRIPT_SUFFIX}"), name, params, window)
+            agreement = check_agreement(variants['eager'], module, inputs)
+            latency = benchmark(module, inputs)
+            print(f"{name:>10} {variant:>6} {model_size(module) / 1024:>9.1f} {latency['p50_ms']:>8.3f} "
+                  f"{latency['p95_ms']:>8.3f} {agreement['max_prob_diff']:>9.2e} {agreement['argmax_agree']:>8.2%}")
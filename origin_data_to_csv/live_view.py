@@ -0,0 +1,90 @@
+# 录制时实时显示点云的窗口。
+#
+# 数据来自 serial_pipeline.LatestFrame：解析线程每解析出一帧就覆盖进去，
+# 这里用 QTimer 按显示帧率去取最新的一帧，显示跟不上时中间的帧直接跳过，不会拖慢录制。
+# 散点图用 scatter_view.PointCloudScatterView（与 show/read_csv/2.py 共用），每帧更新坐标和颜色后用 blit 只重画散点。
+#
+# 单独运行：python live_view.py hub://127.0.0.1:7790，订阅 serial_hub.py，不需要同时录制。
+import sys
+import threading
+import time
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from scatter_view import PointCloudScatterView
+
+
+class LivePointCloudWindow(QWidget):
+    def __init__(self, frame_slot, fps=30):
+        super().__init__()
+        self.setWindowTitle('Live Point Cloud')
+        self.resize(800, 650)
+        self.frame_slot = frame_slot
+
+        self.fig = Figure()
+        self.canvas = FigureCanvas(self.fig)
+        self.view = PointCloudScatterView(self.canvas, self.fig.add_subplot(111, projection='3d'),
+                                          on_drawn=self.count_draw)
+
+        self.fps_label = QLabel('等待数据...')
+        layout = QVBoxLayout()
+        layout.addWidget(self.canvas)
+        layout.addWidget(self.fps_label)
+        self.setLayout(layout)
+
+        # 显示帧率和采集帧率分开统计：前者是实际画出来的帧数，后者是槽的序号增长
+        self.last_seq = 0
+        self.skipped = 0
+        self.draw_count = 0
+        self.window_start = time.perf_counter()
+        self.window_seq = 0
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(max(1, 1000 // fps))
+
+    def poll(self):
+        seq, timestamp, frame_index, points = self.frame_slot.get()
+        now = time.perf_counter()
+        if not self.isVisible():
+            self.last_seq = seq  # 窗口关着的时候不算跳过
+        elif seq != self.last_seq:
+            if self.last_seq:
+                self.skipped += max(seq - self.last_seq - 1, 0)
+            self.last_seq = seq
+            self.show_frame(frame_index, points, time.time() - timestamp)
+
+        if now - self.window_start >= 1.0:
+            elapsed = now - self.window_start
+            acquisition_fps = (seq - self.window_seq) / elapsed
+            self.fps_label.setText(f'显示 {self.draw_count / elapsed:.1f} FPS, 采集 {acquisition_fps:.1f} FPS, '
+                                   f'跳过 {self.skipped} 帧')
+            self.draw_count = 0
+            self.window_start = now
+            self.window_seq = seq
+
+    def show_frame(self, frame_index, points, age):
+        self.view.set_points(points)
+        self.view.title.set_text(f"Frame #{frame_index}, {len(points)} points, {age * 1000:.0f} ms")
+        self.view.refresh()
+
+    def count_draw(self):
+        self.draw_count += 1
+
+if __name__ == '__main__':
+    from serial_hub import DEFAULT_PORT, hub_frames
+    from serial_pipeline import LatestFrame
+
+    url = sys.argv[1] if len(sys.argv) > 1 else f'hub://127.0.0.1:{DEFAULT_PORT}'
+    frame_slot = LatestFrame()
+
+    def subscribe():
+        for timestamp, frame_index, points in hub_frames(url):
+            frame_slot.put(timestamp, frame_index, points)
+
+    threading.Thread(target=subscribe, daemon=True).start()
+    app = QApplication(sys.argv)
+    window = LivePointCloudWindow(frame_slot)
+    window.show()
+    sys.exit(app.exec_())
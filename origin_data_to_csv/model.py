@@ -1,21 +1,37 @@
 import os
-import pandas as pd
+import json
 import numpy as np
 import torch
-import ast
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset
 from sklearn.model_selection import train_test_split
+from pointcloud_io import PCR_SUFFIX
+from dataset_cache import DEFAULT_CACHE_DIR
+from session_index import parse_session_name
+from preprocess import load_sessions, gather_sessions, process_pointcloud, DEFAULT_PARAMS
 
 
 # 自定义数据集类
 class RadarDataset(Dataset):
-    def __init__(self, data_dir, data_txt, max_points=30, transform=None):
+    def __init__(self, data_dir, data_txt, max_points=30, transform=None, cache_dir=None,
+                 coord_scale=100.0, velocity_scale=100.0, snr_scale=1000.0, point_order=None, num_workers=0,
+                 window=None, stride=1):
         self.data_dir = data_dir
         self.max_points = max_points
         self.transform = transform
-        self.samples = []
+        self.coord_scale = coord_scale
+        self.velocity_scale = velocity_scale
+        self.snr_scale = snr_scale
+        self.point_order = point_order  # 一帧点数超过 max_points 时保留哪些点，见 preprocess.process_session
+        self.window = window  # 为 None 时每帧一个样本，否则每 window 个连续帧一个样本
+        self.stride = stride  # 相邻两个窗口起始帧的间隔
         self.data_txt = data_txt
-        self.files = [line.strip() for line in open(self.data_txt, 'r')]
+        # data_txt 可以是文件列表 txt，也可以直接是文件名列表（例如 SessionIndex.files() 的查询结果）
+        if isinstance(data_txt, (list, tuple)):
+            self.files = list(data_txt)
+        else:
+            self.files = [line.strip() for line in open(self.data_txt, 'r')]
+        # 预处理结果缓存在 data_dir/.radar_cache 下，再次运行时直接读取
+        self.cache_dir = cache_dir if cache_dir is not None else os.path.join(data_dir, DEFAULT_CACHE_DIR)
 
         # 定义动作到标签的映射（根据正负样本划分）
         self.action_mapping = {
@@ -31,53 +47,100 @@ class RadarDataset(Dataset):
         }
 
         # 遍历数据目录收集样本
+        file_paths = []
+        file_labels = []
         for filename in self.files:
-            if filename.endswith('.csv'):
+            if filename.endswith(('.csv', PCR_SUFFIX)):
                 # 解析文件名获取动作类型
-                try:
-                    action = filename.split('_')[4]  # 根据实际文件名结构调整索引
-                    label = self.action_mapping[action]
-                except (IndexError, KeyError):
+                meta = parse_session_name(filename)
+                if meta is None or meta['action'] not in self.action_mapping:
                     continue
-
-                # 读取CSV文件
-                file_path = os.path.join(data_dir, filename)
-                df = pd.read_csv(file_path)
-
-                # 处理每一行数据
-                for _, row in df.iterrows():
-                    # 解析点云数据
-                    point_cloud = np.array(ast.literal_eval(row[1]), dtype=np.float32)
-
-                    # 数据预处理：标准化和填充/截断
-                    processed = self.process_pointcloud(point_cloud)
-
-                    self.samples.append((processed, label))
+                label = self.action_mapping[meta['action']]
+                file_paths.append(os.path.join(data_dir, filename))
+                file_labels.append(label)
+
+        # 读取并预处理所有文件（num_workers > 1 时多进程并行，顺序与 data_txt 一致），
+        # 然后拷贝进一块连续数组：data 为 (总帧数, max_points, 5)，第 i 个文件是 data[offsets[i]:offsets[i + 1]]
+        # 只保存 data 和下标，不保存视图：DataLoader 用 spawn 启动 worker 时会把数据集 pickle 过去，视图会被展开成副本
+        sessions = load_sessions(file_paths, self.preprocess_params(), self.cache_dir, num_workers)
+        self.data, self.session_offsets = gather_sessions(sessions, max_points)
+        self.session_files = file_paths
+        self.session_labels = np.array(file_labels, dtype=np.int64)
+        self.labels = np.repeat(self.session_labels, np.diff(self.session_offsets))
+        if window:
+            self.build_windows()
+
+    def session(self, session_idx):
+        """第 session_idx 个文件的所有帧，(帧数, max_points, 5) 视图"""
+        return self.data[self.session_offsets[session_idx]:self.session_offsets[session_idx + 1]]
+
+    def build_windows(self):
+        """在每个文件内部做滑动窗口，只记录每个文件的窗口数，取样本时再从 data 上切片，不会复制数据；
+        窗口不跨文件，帧数不足 window 的文件没有窗口，窗口标签取所在文件的动作标签"""
+        frames = np.diff(self.session_offsets)
+        counts = np.where(frames >= self.window, (frames - self.window) // self.stride + 1, 0)
+        self.window_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.window_offsets[1:])
+        self.window_labels = np.repeat(self.session_labels, np.diff(self.window_offsets))
+
+    def preprocess_params(self):
+        """影响预处理结果的参数，作为缓存键的一部分"""
+        return {
+            'max_points': self.max_points,
+            'coord_scale': self.coord_scale,
+            'velocity_scale': self.velocity_scale,
+            'snr_scale': self.snr_scale,
+            'order': self.point_order,
+        }
 
     def process_pointcloud(self, point_cloud):
         """预处理点云数据：标准化 + 填充/截断"""
-        # 标准化（根据实际情况调整）
-        point_cloud[:, :3] /= 100.0  # 归一化坐标
-        point_cloud[:, 3] /= 100.0  # 归一化速度
-        point_cloud[:, 4] /= 1000.0  # 归一化SNR
-
-        # 填充/截断到固定长度
-        if len(point_cloud) < self.max_points:
-            pad = np.zeros((self.max_points - len(point_cloud), 5))
-            point_cloud = np.concatenate([point_cloud, pad])
-        else:
-            point_cloud = point_cloud[:self.max_points]
-
-        return point_cloud
+        return process_pointcloud(point_cloud, **self.preprocess_params())
 
     def __len__(self):
-        return len(self.files)
-        # return len(self.samples)
+        return len(self.window_labels) if self.window else len(self.labels)
+
+    def session_samples(self, session_idx):
+        """第 session_idx 个文件对应的样本下标"""
+        offsets = self.window_offsets if self.window else self.session_offsets
+        return np.arange(offsets[session_idx], offsets[session_idx + 1])
 
     def __getitem__(self, idx):
-        point_cloud, label = self.samples[idx]
-        point_cloud = torch.tensor(point_cloud, dtype=torch.float32)
-        return point_cloud.permute(1, 0), torch.tensor(label, dtype=torch.long)  # (通道, 时间步)
+        # 返回 numpy 视图，由 collate_samples 一次拷贝成整批张量，不为每个样本单独创建张量
+        if self.window:
+            # 窗口模式：window 帧的点按时间顺序接在一起，(window * max_points, 5)
+            session_idx = np.searchsorted(self.window_offsets, idx, side='right') - 1
+            start = self.session_offsets[session_idx] + (idx - self.window_offsets[session_idx]) * self.stride
+            sample = self.data[start:start + self.window].reshape(-1, 5)
+            label = self.window_labels[idx]
+        else:
+            sample = self.data[idx]
+            label = self.labels[idx]
+        return sample.T, label  # (通道, 时间步)
+
+
+def collate_samples(batch):
+    """把一批 (通道, 时间步) 数组拷进一块预先分配的数组，再零拷贝转成张量"""
+    inputs = np.empty((len(batch),) + batch[0][0].shape, dtype=np.float32)
+    labels = np.empty(len(batch), dtype=np.int64)
+    for i, (sample, label) in enumerate(batch):
+        inputs[i] = sample
+        labels[i] = label
+    return torch.from_numpy(inputs), torch.from_numpy(labels)
+
+
+def split_sessions(dataset, test_size=0.2, random_state=0):
+    """按文件划分训练集和验证集，同一次录制的帧（窗口）不会同时出现在两边，
+    返回 (train_indices, val_indices)"""
+    session_ids = np.arange(len(dataset.session_files))
+    labels = dataset.session_labels
+    # 每类至少两个文件时按标签分层抽样
+    stratify = labels if np.bincount(labels).min() >= 2 and len(np.unique(labels)) > 1 else None
+    train_ids, val_ids = train_test_split(session_ids, test_size=test_size, random_state=random_state,
+                                          stratify=stratify)
+    train_indices = np.concatenate([dataset.session_samples(i) for i in sorted(train_ids)])
+    val_indices = np.concatenate([dataset.session_samples(i) for i in sorted(val_ids)])
+    return train_indices, val_indices
 
 
 # 示例模型1：简单时序卷积网络
@@ -119,8 +182,8 @@ class PointNetMini(torch.nn.Module):
             torch.nn.Linear(16, num_classes))
 
     def forward(self, x):
-        x = self.mlp(x.permute(0, 2, 1))  # (batch, channels, features)
-        x = self.pool(x).squeeze(-1)
+        x = self.mlp(x.permute(0, 2, 1))  # (batch, points, features)
+        x = self.pool(x.permute(0, 2, 1)).squeeze(-1)  # 在所有点上做最大池化 -> (batch, features)
         return self.classifier(x)
 
 
@@ -145,45 +208,40 @@ class HybridModel(torch.nn.Module):
         return self.classifier(h_n[-1])
 
 
-# 数据加载示例
-if __name__ == "__main__":
-    # 参数设置
-    DATA_DIR = "your_data_directory"
-    BATCH_SIZE = 32
-    MAX_POINTS = 30
-
-    # 创建数据集和数据加载器
-    dataset = RadarDataset(DATA_DIR, max_points=MAX_POINTS)
-    train_set, val_set = train_test_split(dataset, test_size=0.2)
-
-    train_loader = DataLoader(train_set, batch_size=BATCH_SIZE, shuffle=True)
-    val_loader = DataLoader(val_set, batch_size=BATCH_SIZE)
-
-    # 模型初始化
-    model = SimpleTCN(num_classes=2)
-    criterion = torch.nn.CrossEntropyLoss()
-    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
-
-    # 简单训练循环示例
-    for epoch in range(10):
-        model.train()
-        for inputs, labels in train_loader:
-            outputs = model(inputs)
-            loss = criterion(outputs, labels)
-
-            optimizer.zero_grad()
-            loss.backward()
-            optimizer.step()
-
-        # 验证
-        model.eval()
-        total = 0
-        correct = 0
-        with torch.no_grad():
-            for inputs, labels in val_loader:
-                outputs = model(inputs)
-                _, predicted = torch.max(outputs.data, 1)
-                total += labels.size(0)
-                correct += (predicted == labels).sum().item()
-
-        print(f"Epoch {epoch + 1}, Val Acc: {correct / total:.2f}")
\ No newline at end of file
+# 模型名称到类的映射，推理、导出脚本按名称创建模型
+MODELS = {
+    'tcn': SimpleTCN,
+    'pointnet': PointNetMini,
+    'hybrid': HybridModel,
+}
+
+
+# export_models.py 导出的 TorchScript 模型文件后缀，文件里附带 meta.json 记录预处理参数和窗口长度
+SCRIPT_SUFFIX = '.ts'
+
+
+def load_checkpoint(checkpoint_path, model_name=None):
+    """加载模型权重，返回 (model, params, window)。
+    checkpoint 可以是训练脚本保存的 dict（包含模型名称、预处理参数和窗口长度）、单纯的 state_dict，
+    或者 export_models.py 导出的 TorchScript 文件"""
+    if checkpoint_path.endswith(SCRIPT_SUFFIX):
+        extra_files = {'meta.json': ''}
+        model = torch.jit.load(checkpoint_path, map_location='cpu', _extra_files=extra_files)
+        meta = json.loads(extra_files['meta.json'] or '{}')
+        return model, dict(meta.get('params', DEFAULT_PARAMS)), meta.get('window') or 1
+
+    checkpoint = torch.load(checkpoint_path, map_location='cpu')
+    if 'state_dict' in checkpoint:
+        model_name = model_name or checkpoint['model']
+        params = checkpoint.get('params', DEFAULT_PARAMS)
+        window = checkpoint.get('window') or 1
+        state_dict = checkpoint['state_dict']
+    else:
+        if model_name is None:
+            raise ValueError("checkpoint 里没有模型名称，需要指定 model_name")
+        params, window, state_dict = DEFAULT_PARAMS, 1, checkpoint
+    model = MODELS[model_name](num_classes=2)
+    model.load_state_dict(state_dict)
+    model.eval()
+    return model, dict(params), window
+
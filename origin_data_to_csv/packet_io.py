@@ -0,0 +1,84 @@
+# 点云数据包在线程和 socket 之间传递的公共部分，serial_hub（分发）、read_serial.py（转发）、
+# stream_infer（接收）共用。
+#
+# PacketQueue：有界队列，满了丢最旧的包（下游要的是最新状态），发送线程把已经到达的几个包合并成一次 sendall。
+# recv_exact：把缓冲区读满，不产生新的 bytes。
+import queue
+import socket
+
+
+class PacketQueue:
+    """put 由生产线程调用，不会阻塞；send_batch 由发送线程调用。计数都是包数（一个包一帧）"""
+
+    def __init__(self, maxsize=256, max_batch=8):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.max_batch = max_batch  # 一次 sendall 最多合并的包数
+        self.queued = 0
+        self.dropped = 0  # 队列满时丢掉的最旧的包
+        self.lost = 0     # 发送失败时丢掉的包
+        self.sent = 0
+        self.bytes_sent = 0
+        self.sends = 0
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def put(self, packet):
+        while True:
+            try:
+                self._queue.put_nowait(packet)
+                self.queued += 1
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get_batch(self, timeout=0.1):
+        """等第一个包最多 timeout 秒，再带上队列里已经到达的包，不额外等待；超时返回空列表"""
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def send_batch(self, sock, timeout=0.1):
+        """取一批合并成一次 sendall，返回发出的包数（队列一直为空时为 0）。
+        发送失败时这一批计入 lost，OSError 照常抛出，由调用方决定断开还是重连"""
+        batch = self.get_batch(timeout)
+        if not batch:
+            return 0
+        data = b''.join(batch)
+        try:
+            sock.sendall(data)
+        except OSError:
+            self.lost += len(batch)
+            raise
+        self.sent += len(batch)
+        self.bytes_sent += len(data)
+        self.sends += 1
+        return len(batch)
+
+
+def recv_exact(sock, view, stop_event=None):
+    """把 view 填满，连接断开时返回 False。
+    socket 设置了超时时，每次超时检查一下 stop_event，已置位也返回 False"""
+    received = 0
+    while received < len(view):
+        try:
+            n = sock.recv_into(view[received:])
+        except socket.timeout:
+            if stop_event is not None and stop_event.is_set():
+                return False
+            continue
+        if n == 0:
+            return False
+        received += n
+    return True
@@ -0,0 +1,340 @@
+# 点云录制文件的二进制格式（.pcr），用来替代 str(frame) 写进 CSV 的做法。
+#
+# 文件结构（小端）：
+#   文件头 16 字节：magic(4) + version(uint16) + 每点字段数(uint16) + 保留(8)
+#   之后是若干帧，每帧 = 帧头 20 字节 + point_num 个点（每点 5 个 int16 = 10 字节）
+#       帧头：timestamp(float64) + frame_index(uint32) + point_num(uint32) + sync(uint32)
+#   正常关闭时在末尾追加帧索引表和 16 字节的尾标记，读取时直接用索引；
+#   如果录制中途崩溃没有索引，读取时会顺着帧头扫描一遍恢复。
+#
+# 帧头正好是两个点的长度，所以整个数据区可以看成 (行数, 5) 的 int16 数组，
+# 单帧的点就是其中连续的一段，可以零拷贝地取出来。
+import os
+import csv
+import sys
+import time
+import ast
+import numpy as np
+
+FILE_MAGIC = b'RPCR'
+FILE_VERSION = 1
+POINT_FIELDS = 5  # x, y, z, v, snr
+FILE_HEADER_SIZE = 16
+FRAME_SYNC = 0x454D5246  # b'FRME'
+INDEX_MAGIC = b'PCRINDEX'
+
+FILE_HEADER_DTYPE = np.dtype([('magic', 'S4'), ('version', '<u2'), ('fields', '<u2'), ('reserved', 'V8')])
+FRAME_HEADER_DTYPE = np.dtype([('timestamp', '<f8'), ('frame_index', '<u4'), ('point_num', '<u4'), ('sync', '<u4')])
+INDEX_DTYPE = np.dtype([('timestamp', '<f8'), ('frame_index', '<u4'), ('point_num', '<u4'), ('row', '<i8')])
+TRAILER_DTYPE = np.dtype([('magic', 'S8'), ('index_offset', '<i8')])
+
+ROW_SIZE = POINT_FIELDS * 2  # 一行（一个点）占用的字节数
+HEADER_ROWS = FRAME_HEADER_DTYPE.itemsize // ROW_SIZE  # 帧头占用的行数
+
+PCR_SUFFIX = '.pcr'
+
+
+def format_time_str(timestamp):
+    """把时间戳格式化成录制 CSV 里使用的 "%Y-%m-%d %H:%M:%S.mmm" 字符串"""
+    seconds, millis = divmod(int(round(timestamp * 1000)), 1000)
+    time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(seconds))
+    return f"{time_str}.{millis:03d}"
+
+
+def parse_time_str(time_str):
+    """format_time_str 的逆操作，兼容早期不带毫秒的时间字符串"""
+    time_str = time_str.strip()
+    base, _, millis = time_str.partition('.')
+    timestamp = time.mktime(time.strptime(base, "%Y-%m-%d %H:%M:%S"))
+    if millis:
+        timestamp += int(millis) / 1000.0
+    return timestamp
+
+
+class PointCloudWriter:
+    """按帧追加写入 .pcr 文件，close 时写入帧索引"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, 'wb')
+        self._index = []
+        self._row = 0
+        self.frame_count = 0
+        self.point_count = 0
+
+        header = np.zeros(1, dtype=FILE_HEADER_DTYPE)
+        header['magic'] = FILE_MAGIC
+        header['version'] = FILE_VERSION
+        header['fields'] = POINT_FIELDS
+        self._file.write(header.tobytes())
+        self.bytes_written = FILE_HEADER_SIZE
+
+    def write_frame(self, points, timestamp=None, frame_index=0):
+        """写入一帧，points 为 (N, 5) 的数组或 [[x, y, z, v, snr], ...] 列表"""
+        if timestamp is None:
+            timestamp = time.time()
+        points = np.ascontiguousarray(points, dtype='<i2').reshape(-1, POINT_FIELDS)
+        point_num = len(points)
+
+        frame_header = np.zeros(1, dtype=FRAME_HEADER_DTYPE)
+        frame_header['timestamp'] = timestamp
+        frame_header['frame_index'] = frame_index
+        frame_header['point_num'] = point_num
+        frame_header['sync'] = FRAME_SYNC
+        self._file.write(frame_header.tobytes())
+        self._file.write(points.tobytes())
+
+        self._index.append((timestamp, frame_index, point_num, self._row))
+        self._row += HEADER_ROWS + point_num
+        self.frame_count += 1
+        self.point_count += point_num
+        self.bytes_written += FRAME_HEADER_DTYPE.itemsize + point_num * ROW_SIZE
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        index_offset = FILE_HEADER_SIZE + self._row * ROW_SIZE
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        trailer = np.array([(INDEX_MAGIC, index_offset)], dtype=TRAILER_DTYPE)
+        self._file.write(index.tobytes())
+        self._file.write(trailer.tobytes())
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class PointCloudRecording:
+    """只读打开一个 .pcr 文件，数据区用 np.memmap 映射，不会整体读进内存"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        # 先检查大小：0 字节的文件无法映射，np.memmap 会直接报错
+        if os.path.getsize(file_path) < FILE_HEADER_SIZE:
+            raise ValueError(f"文件过短，不是有效的点云录制文件: {file_path}")
+        raw = np.memmap(file_path, dtype=np.uint8, mode='r')
+        header = raw[:FILE_HEADER_SIZE].view(FILE_HEADER_DTYPE)[0]
+        if header['magic'] != FILE_MAGIC or header['fields'] != POINT_FIELDS:
+            raise ValueError(f"不是有效的点云录制文件: {file_path}")
+
+        data_end, index = self._read_index(raw)
+        self.complete = index is not None
+        data_rows = (data_end - FILE_HEADER_SIZE) // ROW_SIZE
+        data = raw[FILE_HEADER_SIZE:FILE_HEADER_SIZE + data_rows * ROW_SIZE]
+        self._rows = data.view('<i2').reshape(-1, POINT_FIELDS)
+        if index is None:
+            index = self._scan_index(data)
+
+        self.timestamps = index['timestamp'].astype(np.float64)
+        self.frame_indices = index['frame_index'].astype(np.int64)
+        self.point_nums = index['point_num'].astype(np.int64)
+        self._starts = index['row'].astype(np.int64) + HEADER_ROWS
+        # offsets[i]:offsets[i + 1] 是第 i 帧在 points 里的范围
+        self.offsets = np.zeros(len(index) + 1, dtype=np.int64)
+        np.cumsum(self.point_nums, out=self.offsets[1:])
+        self._points = None
+
+    @staticmethod
+    def _read_index(raw):
+        """读取文件末尾的帧索引，没有索引（录制未正常结束）时返回 None"""
+        if len(raw) >= FILE_HEADER_SIZE + TRAILER_DTYPE.itemsize:
+            trailer = raw[-TRAILER_DTYPE.itemsize:].view(TRAILER_DTYPE)[0]
+            index_offset = int(trailer['index_offset'])
+            index_end = len(raw) - TRAILER_DTYPE.itemsize
+            if (trailer['magic'] == INDEX_MAGIC and FILE_HEADER_SIZE <= index_offset <= index_end
+                    and (index_end - index_offset) % INDEX_DTYPE.itemsize == 0):
+                return index_offset, raw[index_offset:index_end].view(INDEX_DTYPE)
+        return len(raw), None
+
+    @staticmethod
+    def _scan_index(data):
+        """顺着帧头扫描数据区重建索引，遇到不完整或损坏的帧就停止"""
+        index = []
+        pos = 0
+        total = len(data)
+        header_size = FRAME_HEADER_DTYPE.itemsize
+        while pos + header_size <= total:
+            frame_header = data[pos:pos + header_size].view(FRAME_HEADER_DTYPE)[0]
+            point_num = int(frame_header['point_num'])
+            end = pos + header_size + point_num * ROW_SIZE
+            if frame_header['sync'] != FRAME_SYNC or end > total:
+                break
+            index.append((frame_header['timestamp'], frame_header['frame_index'], point_num, pos // ROW_SIZE))
+            pos = end
+        return np.array(index, dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def seek_time(self, timestamp):
+        """返回时间戳不早于 timestamp 的第一帧的序号"""
+        return min(int(np.searchsorted(self.timestamps, timestamp)), max(len(self) - 1, 0))
+
+    def frame(self, i):
+        """返回第 i 帧的 (N, 5) int16 数组，是映射文件上的视图，不拷贝"""
+        start = self._starts[i]
+        return self._rows[start:start + self.point_nums[i]]
+
+    @property
+    def points(self):
+        """整段录制所有点拼接成的 (总点数, 5) int16 数组，配合 offsets 按帧切分"""
+        if self._points is None:
+            total = int(self.offsets[-1])
+            # 每个点所在的行号 = 所在帧的起始行 + 帧内序号
+            rows = np.repeat(self._starts - self.offsets[:-1], self.point_nums) + np.arange(total)
+            self._points = np.asarray(self._rows[rows])
+        return self._points
+
+
+def load_recording(file_path):
+    """读取 .pcr 文件，返回 (points, offsets, timestamps)"""
+    recording = PointCloudRecording(file_path)
+    return recording.points, recording.offsets, recording.timestamps
+
+
+def csv_frame_to_points(frame):
+    """把 CSV 里的一帧 [[x, y, z, v, snr], ...] 转成 (N, 5) int16 数组，
+    串口数据错乱时偶尔会有超出 int16 范围的点，直接丢弃"""
+    points = np.array(frame, dtype=np.int64).reshape(-1, POINT_FIELDS)
+    valid = np.all((points >= np.iinfo(np.int16).min) & (points <= np.iinfo(np.int16).max), axis=1)
+    return points[valid].astype(np.int16)
+
+
+def iter_csv_frames(csv_path):
+    """逐帧读取旧的 CSV 录制文件，返回 (timestamp, points)，跳过注释行和无法解析的行"""
+    with open(csv_path, 'r', encoding='utf-8', errors='ignore') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        for row in reader:
+            if len(row) < 2:
+                continue
+            try:
+                timestamp = parse_time_str(row[0])
+                frame = ast.literal_eval(row[1])
+            except (ValueError, SyntaxError):
+                continue
+            yield timestamp, csv_frame_to_points(frame)
+
+
+CSV_INDEX_SUFFIX = '.idx.npz'
+CSV_INDEX_DTYPE = np.dtype([('timestamp', '<f8'), ('start', '<i8'), ('end', '<i8')])
+_BRACKETS = str.maketrans('', '', '[]')
+
+
+class CsvRecording:
+    """按需读取旧的 CSV 录制文件：文件用 mmap 映射，第一次打开时建立每帧的 (时间戳, 起止字节) 索引，
+    缓存在文件旁边的 .idx.npz 里（源文件大小或修改时间变化时重建），之后 frame(i) 只解析第 i 行。
+    接口与 PointCloudRecording 一致"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        # 空文件不能 mmap
+        self._raw = np.memmap(file_path, dtype=np.uint8, mode='r') if os.path.getsize(file_path) \
+            else np.zeros(0, dtype=np.uint8)
+        index = self._load_index()
+        self.timestamps = index['timestamp']
+        self._starts = index['start']
+        self._ends = index['end']
+        self.frame_indices = np.arange(len(index), dtype=np.int64)
+        self.complete = True
+
+    def _load_index(self):
+        stat = os.stat(self.file_path)
+        source = np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+        index_path = self.file_path + CSV_INDEX_SUFFIX
+        try:
+            with np.load(index_path) as cached:
+                if np.array_equal(cached['source'], source):
+                    return cached['index']
+        except (OSError, KeyError, ValueError):
+            pass
+        index = self._build_index()
+        try:
+            with open(index_path, 'wb') as file:
+                np.savez(file, index=index, source=source)
+        except OSError:
+            pass  # 目录不可写时不缓存，下次重新建立
+        return index
+
+    def _build_index(self):
+        """找出所有以数字开头（时间戳）的行，跳过表头和 // 注释行"""
+        raw = self._raw
+        line_ends = np.flatnonzero(raw == ord('\n'))
+        if len(raw) and raw[-1] != ord('\n'):
+            line_ends = np.append(line_ends, len(raw))
+        line_starts = np.concatenate(([0], line_ends[:-1] + 1)).astype(np.int64)
+        line_starts, line_ends = line_starts[line_starts < line_ends], line_ends[line_starts < line_ends]
+        first_char = raw[line_starts]
+        is_data = (first_char >= ord('0')) & (first_char <= ord('9'))
+        index = []
+        for start, end in zip(line_starts[is_data], line_ends[is_data]):
+            time_field = bytes(raw[start:min(end, start + 32)]).split(b',', 1)[0]
+            try:
+                timestamp = parse_time_str(time_field.decode('ascii'))
+            except (ValueError, UnicodeDecodeError):
+                continue
+            index.append((timestamp, start, end))
+        return np.array(index, dtype=CSV_INDEX_DTYPE)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def frame(self, i):
+        """解析第 i 帧，返回 (N, 5) int16 数组"""
+        line = bytes(self._raw[self._starts[i]:self._ends[i]]).decode('utf-8', errors='ignore')
+        first = line.find('[')
+        last = line.rfind(']')
+        if first < 0 or last <= first:
+            return np.empty((0, POINT_FIELDS), dtype=np.int16)
+        values = line[first:last + 1].translate(_BRACKETS)
+        if not values.strip(' ,'):
+            return np.empty((0, POINT_FIELDS), dtype=np.int16)
+        try:
+            points = np.fromstring(values, dtype=np.int64, sep=',')
+        except ValueError:
+            return np.empty((0, POINT_FIELDS), dtype=np.int16)
+        return csv_frame_to_points(points[:len(points) // POINT_FIELDS * POINT_FIELDS])
+
+    def seek_time(self, timestamp):
+        """返回时间戳不早于 timestamp 的第一帧的序号"""
+        return min(int(np.searchsorted(self.timestamps, timestamp)), max(len(self) - 1, 0))
+
+
+def open_recording(file_path):
+    """按后缀打开 .pcr 或 CSV 录制文件，都可以用 len() / frame(i) / timestamps 随机访问"""
+    if file_path.endswith(PCR_SUFFIX):
+        return PointCloudRecording(file_path)
+    return CsvRecording(file_path)
+
+
+def convert_csv(csv_path, pcr_path=None):
+    """把旧的 CSV 录制文件转换成 .pcr 文件，返回转换后的帧数"""
+    if pcr_path is None:
+        pcr_path = os.path.splitext(csv_path)[0] + PCR_SUFFIX
+    with PointCloudWriter(pcr_path) as writer:
+        for frame_index, (timestamp, points) in enumerate(iter_csv_frames(csv_path)):
+            writer.write_frame(points, timestamp, frame_index)
+        return writer.frame_count
+
+
+if __name__ == '__main__':
+    # 用法：python pointcloud_io.py 目录或csv文件 ...
+    # 把 CSV 转换成同名的 .pcr 文件放在原文件旁边，已经转换过的跳过
+    for target in sys.argv[1:] or ['./fall_bed_data']:
+        if os.path.isdir(target):
+            csv_files = sorted(os.path.join(target, f) for f in os.listdir(target) if f.endswith('.csv'))
+        else:
+            csv_files = [target]
+        for csv_path in csv_files:
+            pcr_path = os.path.splitext(csv_path)[0] + PCR_SUFFIX
+            if os.path.exists(pcr_path):
+                continue
+            frame_count = convert_csv(csv_path, pcr_path)
+            print(f"{csv_path} -> {pcr_path}, {frame_count} 帧, "
+                  f"{os.path.getsize(csv_path)} -> {os.path.getsize(pcr_path)} 字节")
@@ -0,0 +1,104 @@
+# RadarDataset 的数据读取和预处理，只依赖 numpy，不导入 torch，
+# 这样多进程加载时子进程启动得快。
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from pointcloud_io import load_recording, iter_csv_frames, PCR_SUFFIX
+from dataset_cache import SessionCache
+
+
+POINT_ORDERS = (None, 'snr', 'range')
+# 与 RadarDataset 默认参数一致的预处理参数
+DEFAULT_PARAMS = {'max_points': 30, 'coord_scale': 100.0, 'velocity_scale': 100.0, 'snr_scale': 1000.0, 'order': None}
+
+
+def load_points(file_path):
+    """读取一个录制文件（.pcr 或旧的 CSV），返回 (points, offsets)：
+    points 为所有帧拼接的 (总点数, 5) 数组，第 i 帧是 points[offsets[i]:offsets[i + 1]]"""
+    if file_path.endswith(PCR_SUFFIX):
+        points, offsets, _ = load_recording(file_path)
+        return points, offsets
+
+    frames = [points for _, points in iter_csv_frames(file_path)]
+    offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+    np.cumsum([len(frame) for frame in frames], out=offsets[1:])
+    points = np.concatenate(frames) if frames else np.empty((0, 5), dtype=np.int16)
+    return points, offsets
+
+
+def process_session(points, offsets, max_points, coord_scale=100.0, velocity_scale=100.0, snr_scale=1000.0,
+                    order=None):
+    """一次处理整段录制：标准化 + 每帧填充/截断到 max_points，返回 (帧数, max_points, 5) float32 数组。
+    order 决定一帧点数超过 max_points 时保留哪些点：None 按原始顺序，'snr' 保留 SNR 最高的，
+    'range' 保留离雷达最近的。"""
+    if order not in POINT_ORDERS:
+        raise ValueError(f"未知的点排序方式: {order}")
+    counts = np.diff(offsets)
+    frame_num = len(counts)
+    # 每个点所属的帧，以及在帧内的序号
+    frame_ids = np.repeat(np.arange(frame_num), counts)
+    ranks = np.arange(len(points)) - np.repeat(offsets[:-1], counts)
+
+    if order is not None and len(points):
+        if order == 'snr':
+            key = -points[:, 4].astype(np.float32)
+        else:
+            key = np.square(points[:, :3].astype(np.float32)).sum(axis=1)
+        # 帧号为第一关键字，帧内按 key 排序；各帧的点数不变，所以 ranks 依然有效
+        points = points[np.lexsort((key, frame_ids))]
+
+    scale = np.array([coord_scale, coord_scale, coord_scale, velocity_scale, snr_scale], dtype=np.float32)
+    session = np.zeros((frame_num, max_points, 5), dtype=np.float32)
+    keep = ranks < max_points
+    session[frame_ids[keep], ranks[keep]] = points[keep] / scale
+    return session
+
+
+def process_pointcloud(point_cloud, max_points, coord_scale=100.0, velocity_scale=100.0, snr_scale=1000.0,
+                       order=None):
+    """预处理单帧点云数据：标准化 + 填充/截断，返回 (max_points, 5) float32 数组"""
+    offsets = np.array([0, len(point_cloud)], dtype=np.int64)
+    return process_session(point_cloud, offsets, max_points, coord_scale, velocity_scale, snr_scale, order)[0]
+
+
+def preprocess_file(file_path, params):
+    """读取并预处理一个录制文件，返回 (帧数, max_points, 5) 的 float32 数组"""
+    points, offsets = load_points(file_path)
+    return process_session(points, offsets, **params)
+
+
+def load_session(file_path, params, cache_dir=None):
+    """返回预处理后的数组，cache_dir 不为 None 时优先读缓存，没有缓存时生成并写入"""
+    if cache_dir is None:
+        return preprocess_file(file_path, params)
+    cache = SessionCache(cache_dir)
+    session = cache.load(file_path, params)
+    if session is None:
+        session = cache.save(file_path, params, preprocess_file(file_path, params))
+    return session
+
+
+def _load_session_task(task):
+    file_path, params, cache_dir = task
+    return np.asarray(load_session(file_path, params, cache_dir))
+
+
+def load_sessions(file_paths, params, cache_dir=None, num_workers=0):
+    """按 file_paths 的顺序加载多个文件。num_workers > 1 时用进程池并行，返回顺序与输入一致"""
+    tasks = [(file_path, params, cache_dir) for file_path in file_paths]
+    if num_workers <= 1 or len(tasks) <= 1:
+        return [_load_session_task(task) for task in tasks]
+    chunksize = max(1, len(tasks) // (num_workers * 4))
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        return list(executor.map(_load_session_task, tasks, chunksize=chunksize))
+
+
+def gather_sessions(sessions, max_points):
+    """把各文件的数组拷贝进一块预先分配好的连续数组，
+    返回 (data, offsets)，第 i 个文件是 data[offsets[i]:offsets[i + 1]]"""
+    offsets = np.zeros(len(sessions) + 1, dtype=np.int64)
+    np.cumsum([len(session) for session in sessions], out=offsets[1:])
+    data = np.empty((offsets[-1], max_points, 5), dtype=np.float32)
+    for i, session in enumerate(sessions):
+        data[offsets[i]:offsets[i + 1]] = session
+    return data, offsets
+
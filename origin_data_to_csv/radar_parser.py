@@ -0,0 +1,137 @@
+# 雷达串口 ASCII 协议解析，所有录制脚本和转发脚本共用。
+#
+# 每帧一行：frame_index,point_num,x,y,z,v,snr,x,y,z,v,snr,...（末尾可能多一个逗号）
+# 整行一次性用 np.fromstring 转成整数数组，不再逐个字段 int()。
+# SerialLineReader 负责把串口读到的字节切成完整的行，录制、转发、分发程序共用。
+import time
+import numpy as np
+
+POINT_FIELDS = 5  # x, y, z, v, snr
+INT16_MIN = np.iinfo(np.int16).min
+INT16_MAX = np.iinfo(np.int16).max
+FRAME_INDEX_LIMIT = 2 ** 32  # 帧索引写入文件 / 转发时都是 uint32
+MAX_LINE_BYTES = 64 * 1024  # 超过这个长度还没有换行符，认为数据错乱，直接丢弃
+
+
+class ParseStats:
+    """解析计数，代替原来逐行 print 的错误信息"""
+
+    def __init__(self):
+        self.lines = 0          # 收到的非空行数
+        self.frames = 0         # 成功解析的帧数
+        self.points = 0         # 成功解析的点数
+        self.bad_number = 0     # 含有无法转换为整数的字段
+        self.too_short = 0      # 字段数不足：缺少帧头或点数据不够 point_num * 5
+        self.out_of_range = 0   # 帧索引不在 uint32 范围内，或点数据超出 int16 范围
+
+    @property
+    def malformed(self):
+        return self.bad_number + self.too_short + self.out_of_range
+
+    def as_dict(self):
+        return {
+            'lines': self.lines,
+            'frames': self.frames,
+            'points': self.points,
+            'malformed': self.malformed,
+            'bad_number': self.bad_number,
+            'too_short': self.too_short,
+            'out_of_range': self.out_of_range,
+        }
+
+
+def parse_line(line, stats=None):
+    """解析一行数据（str 或 bytes），返回 (frame_index, points)，points 为 (N, 5) 的 int16 数组。
+    空行或格式错误的行返回 None，错误类型记在 stats 里。"""
+    if stats is None:
+        stats = ParseStats()
+    strip_chars = b' ,\r\n\t' if isinstance(line, (bytes, bytearray)) else ' ,\r\n\t'
+    line = line.strip(strip_chars)
+    if not line:
+        return None
+    stats.lines += 1
+
+    try:
+        # int64：int32 解析超出范围的数会静默回绕，帧索引的范围检查就失效了
+        values = np.fromstring(line, dtype=np.int64, sep=',')
+    except ValueError:
+        stats.bad_number += 1
+        return None
+
+    if len(values) < 2:
+        stats.too_short += 1
+        return None
+    frame_index = int(values[0])
+    if not 0 <= frame_index < FRAME_INDEX_LIMIT:
+        # 从一行的中间开始读到的数据（比如串口刚打开时）帧索引可能是负数
+        stats.out_of_range += 1
+        return None
+    point_num = int(values[1])
+    data = values[2:2 + point_num * POINT_FIELDS]
+    if point_num < 0 or len(data) < point_num * POINT_FIELDS:
+        # 旧版本 numpy 遇到非法字段不会报错，只返回前面能解析的部分，也会落到这里
+        stats.too_short += 1
+        return None
+    if point_num and (data.min() < INT16_MIN or data.max() > INT16_MAX):
+        stats.out_of_range += 1
+        return None
+
+    stats.frames += 1
+    stats.points += point_num
+    return frame_index, data.astype(np.int16).reshape(point_num, POINT_FIELDS)
+
+
+def parse_lines(buffer, stats=None):
+    """解析包含多行数据的缓冲区，返回 (frame_indices, points, offsets)。
+    points 为所有帧拼接的 (总点数, 5) int16 数组，第 i 帧是 points[offsets[i]:offsets[i + 1]]，
+    与 pointcloud_io 读出来的布局一致。"""
+    if stats is None:
+        stats = ParseStats()
+    frame_indices = []
+    frames = []
+    for line in buffer.splitlines():
+        parsed = parse_line(line, stats)
+        if parsed is not None:
+            frame_indices.append(parsed[0])
+            frames.append(parsed[1])
+
+    offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+    np.cumsum([len(frame) for frame in frames], out=offsets[1:])
+    if frames:
+        points = np.concatenate(frames)
+    else:
+        points = np.empty((0, POINT_FIELDS), dtype=np.int16)
+    return np.array(frame_indices, dtype=np.int64), points, offsets
+
+
+class SerialLineReader:
+    """从串口读数据并切成完整的行。ser 只需要有 read(n) 和 in_waiting（pyserial 的 Serial 即可）"""
+
+    def __init__(self, ser):
+        self.ser = ser
+        self.bytes_received = 0
+        self.lines_received = 0
+        self.garbage_bytes = 0
+        self._pending = bytearray()
+
+    def read_lines(self):
+        """读一次串口，返回 (接收时间, 这次凑成的完整行列表)。没读到数据时返回 (None, [])，
+        行不完整时剩下的部分留到下一次"""
+        data = self.ser.read(self.ser.in_waiting or 1)
+        if not data:
+            return None, []
+        timestamp = time.time()
+        self.bytes_received += len(data)
+        pending = self._pending
+        pending += data
+
+        end = pending.rfind(b'\n')
+        if end < 0:
+            if len(pending) > MAX_LINE_BYTES:
+                self.garbage_bytes += len(pending)
+                pending.clear()
+            return timestamp, []
+        lines = bytes(pending[:end]).split(b'\n')
+        del pending[:end + 1]
+        self.lines_received += len(lines)
+        return timestamp, lines
@@ -0,0 +1,63 @@
+# 3D 点云散点图，实时显示（live_view.py）和回放（show/read_csv/2.py）共用。
+#
+# 坐标轴、散点对象只创建一次，每帧只更新散点的坐标和颜色；
+# 完整绘制（第一次显示、改变窗口大小、拖动旋转视角）后缓存不含动态对象的背景，之后每帧用 blit 只重画动态对象。
+import numpy as np
+
+SNR_RANGE = (1000, 4000)  # 散点颜色对应的 SNR 范围，固定下来帧与帧之间颜色可比
+
+
+class PointCloudScatterView:
+    """ax 为 3D 坐标轴。on_drawn 在每次实际画出一帧后调用，用来统计显示帧率"""
+
+    def __init__(self, canvas, ax, on_drawn=None):
+        self.canvas = canvas
+        self.fig = canvas.figure
+        self.ax = ax
+        self.on_drawn = on_drawn
+        ax.set_xlim(-500, 800)
+        ax.set_ylim(-500, 800)
+        ax.set_zlim(-200, 200)
+        ax.set_xlabel("X")
+        ax.set_ylabel("Y")
+        ax.set_zlabel("Z")
+        self.title = ax.set_title("", animated=True)
+        self.scatter = ax.scatter([], [], [], c=[], cmap='viridis', s=20, vmin=SNR_RANGE[0], vmax=SNR_RANGE[1],
+                                  depthshade=False, animated=True)
+        self.extra_artists = []  # (坐标轴, 对象)，其它每帧要重画的对象（轨迹、热力图等），画在散点下面
+        self.background = None
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def add_artist(self, artist, ax=None):
+        """登记一个每帧要重画的对象，创建时需要 animated=True"""
+        self.extra_artists.append((ax or self.ax, artist))
+
+    def set_points(self, points):
+        """points 为 (N, 5) 数组：x, y, z, v, snr"""
+        xs, ys, zs = points[:, :3].astype(np.float32).T
+        self.scatter._offsets3d = (xs, ys, zs)
+        self.scatter.set_array(points[:, 4].astype(np.float32))
+
+    def refresh(self):
+        """把更新过的动态对象画到屏幕上"""
+        if self.background is None:
+            # 还没有完整绘制过，走一次完整绘制，由 on_draw 画出动态对象
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_animated()
+        self.canvas.blit(self.fig.bbox)
+        if self.on_drawn is not None:
+            self.on_drawn()
+
+    def draw_animated(self):
+        for ax, artist in self.extra_artists + [(self.ax, self.scatter), (self.ax, self.title)]:
+            if hasattr(artist, 'do_3d_projection'):
+                artist.do_3d_projection()
+            ax.draw_artist(artist)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_animated()
+        if self.on_drawn is not None:
+            self.on_drawn()
@@ -0,0 +1,212 @@
+# 串口分发：一个进程独占雷达串口，每帧只解析一次，通过本机 TCP 发给任意多个订阅者
+# （录制 data_collect.py、转发 read_serial.py、实时显示 live_view.py、推理 stream_infer.py / batch_infer.py）。
+#
+# 每帧只编码一次，所有订阅者共享同一个 bytes。每个订阅者有自己的有界队列和发送线程，
+# 某个订阅者处理得慢时只丢它自己队列里最旧的帧并计数，不影响串口读取和其它订阅者。
+#
+# 包格式：包头 接收时间 (float64), 帧索引 (uint32), 点数 (uint32)；包体：每个点 5 个 int16
+# 订阅方把 hub://127.0.0.1:7790 当作串口名传进去即可，见 HubClient / hub_frames。
+#
+# 用法：python serial_hub.py [串口] [端口]
+import sys
+import time
+import socket
+import struct
+import threading
+import numpy as np
+import serial
+from radar_parser import ParseStats, SerialLineReader, parse_line
+from packet_io import PacketQueue, recv_exact
+
+HUB_SCHEME = 'hub://'
+DEFAULT_PORT = 7790
+FRAME_HEADER = struct.Struct('<dII')
+
+
+def encode_frame(timestamp, frame_index, points):
+    return FRAME_HEADER.pack(timestamp, frame_index, len(points)) + np.ascontiguousarray(points, dtype='<i2').tobytes()
+
+
+def parse_hub_url(url):
+    """hub://host:port -> (host, port)"""
+    host, port = url[len(HUB_SCHEME):].rsplit(':', 1)
+    return host, int(port)
+
+
+class Subscriber:
+    """一个订阅连接：有界队列 + 发送线程，队列满时丢最旧的帧"""
+
+    def __init__(self, sock, name, queue_size=256, max_batch=16):
+        self.sock = sock
+        self.name = name
+        self.packets = PacketQueue(queue_size, max_batch)
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f'hub-{name}', daemon=True)
+
+    @property
+    def frames_dropped(self):
+        return self.packets.dropped
+
+    def offer(self, packet):
+        """串口读线程调用，不会阻塞"""
+        self.packets.put(packet)
+
+    def run(self):
+        try:
+            while not self.closed.is_set():
+                self.packets.send_batch(self.sock)
+        except OSError as e:
+            print(f"[Hub] {self.name} 断开: {e}")
+        finally:
+            self.closed.set()
+            self.sock.close()
+
+    def stats(self):
+        return {'name': self.name, 'queue_size': self.packets.qsize(), 'frames_sent': self.packets.sent,
+                'frames_dropped': self.packets.dropped, 'bytes_sent': self.packets.bytes_sent}
+
+
+class SerialHub:
+    def __init__(self, com_port, baud_rate=921600, host='127.0.0.1', port=DEFAULT_PORT, queue_size=256, max_batch=16):
+        self.com_port = com_port
+        self.baud_rate = baud_rate
+        self.address = (host, port)
+        self.queue_size = queue_size
+        self.max_batch = max_batch
+        self.parse_stats = ParseStats()
+        self.bytes_received = 0
+        self.garbage_bytes = 0
+        self.subscribers = ()  # 整体替换，读线程遍历时不用加锁
+        self.error = None
+
+        self._serial = None
+        self._listener = None
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def start(self):
+        # 在调用方线程里打开串口和监听端口，失败时直接抛异常
+        self._serial = serial.Serial(self.com_port, self.baud_rate, timeout=0.1)
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(self.address)
+        self._listener.listen(16)
+        self._listener.settimeout(0.5)
+        self.address = self._listener.getsockname()
+        self._threads = [
+            threading.Thread(target=self._read_loop, name='serial-reader', daemon=True),
+            threading.Thread(target=self._accept_loop, name='hub-accept', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for subscriber in self.subscribers:
+            subscriber.closed.set()
+            try:
+                subscriber.sock.shutdown(socket.SHUT_RDWR)  # 让卡在 sendall 里的发送线程退出
+            except OSError:
+                pass
+        for subscriber in self.subscribers:
+            subscriber.thread.join()
+        self.subscribers = ()
+        self._serial.close()
+        self._listener.close()
+
+    def _accept_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                sock, addr = self._listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            subscriber = Subscriber(sock, f"{addr[0]}:{addr[1]}", self.queue_size, self.max_batch)
+            subscriber.thread.start()
+            with self._lock:
+                self.subscribers = tuple(s for s in self.subscribers if not s.closed.is_set()) + (subscriber,)
+            print(f"[Hub] 新订阅者 {subscriber.name}")
+
+    def publish(self, timestamp, frame_index, points):
+        packet = encode_frame(timestamp, frame_index, points)
+        for subscriber in self.subscribers:
+            if not subscriber.closed.is_set():
+                subscriber.offer(packet)
+
+    def _read_loop(self):
+        reader = SerialLineReader(self._serial)
+        try:
+            while not self._stop_event.is_set():
+                timestamp, lines = reader.read_lines()
+                self.bytes_received = reader.bytes_received
+                self.garbage_bytes = reader.garbage_bytes
+                for line in lines:
+                    parsed = parse_line(line, self.parse_stats)
+                    if parsed is not None:
+                        self.publish(timestamp, *parsed)
+        except Exception as e:
+            self.error = e
+
+    def stats(self):
+        return {
+            'bytes_received': self.bytes_received,
+            'garbage_bytes': self.garbage_bytes,
+            'frames_parsed': self.parse_stats.frames,
+            'parse_errors': self.parse_stats.malformed,
+            'subscribers': [s.stats() for s in self.subscribers if not s.closed.is_set()],
+        }
+
+
+class HubClient:
+    """订阅 SerialHub。frames() 逐帧返回 (接收时间, frame_index, points)，hub 断开或 stop_event 置位后结束"""
+
+    def __init__(self, url, stop_event=None, timeout=0.5):
+        self.address = parse_hub_url(url)
+        self.stop_event = stop_event or threading.Event()
+        self.timeout = timeout  # 等数据时每隔这么久检查一次 stop_event
+        self.bytes_received = 0
+
+    def _recv_exact(self, sock, view):
+        if not recv_exact(sock, view, self.stop_event):
+            return False
+        self.bytes_received += len(view)
+        return True
+
+    def frames(self):
+        header = bytearray(FRAME_HEADER.size)
+        with socket.create_connection(self.address) as sock:
+            sock.settimeout(self.timeout)
+            while not self.stop_event.is_set() and self._recv_exact(sock, memoryview(header)):
+                timestamp, frame_index, point_num = FRAME_HEADER.unpack(header)
+                body = bytearray(point_num * 10)
+                if not self._recv_exact(sock, memoryview(body)):
+                    break
+                yield timestamp, frame_index, np.frombuffer(body, dtype='<i2').reshape(point_num, 5)
+
+
+def hub_frames(url):
+    """订阅 hub，返回 (接收时间, frame_index, points)"""
+    return HubClient(url).frames()
+
+
+if __name__ == '__main__':
+    com_port = sys.argv[1] if len(sys.argv) > 1 else 'COM30'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT
+    hub = SerialHub(com_port, port=port)
+    hub.start()
+    print(f"[Hub] {com_port} -> {HUB_SCHEME}{hub.address[0]}:{hub.address[1]}")
+    try:
+        while hub.error is None:
+            time.sleep(5)
+            print(hub.stats())
+        print(f"读取串口出错: {hub.error}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hub.stop()
@@ -0,0 +1,263 @@
+# 串口录制流水线：读串口、解析、写文件分别在三个线程里进行，互不阻塞。
+#
+#   读线程：只负责把串口里的数据读出来切成行，连同接收时间放进预分配的环形缓冲区
+#   解析线程：从环形缓冲区批量取行，用 radar_parser 解析成 (N, 5) int16 数组，放进有界帧队列
+#   写线程：从帧队列批量取帧写入 .pcr 文件，定时 flush
+#
+# 任何一级跟不上时只会丢数据并计数（环形缓冲区满 / 帧队列满），不会反过来卡住串口读取。
+# com_port 为 hub://host:port 时从 serial_hub 订阅已经解析好的帧，读线程和解析线程换成一个订阅线程。
+import time
+import queue
+import threading
+import numpy as np
+import serial
+from pointcloud_io import PointCloudWriter
+from radar_parser import ParseStats, SerialLineReader, parse_line
+from serial_hub import HUB_SCHEME, HubClient
+
+
+class LineRing:
+    """预分配的定长环形缓冲区，存放 (接收时间, 原始行)。写满时丢弃新来的行并计数"""
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self._lines = [None] * capacity
+        self._stamps = np.zeros(capacity, dtype=np.float64)
+        self._head = 0  # 累计写入行数
+        self._tail = 0  # 累计取出行数
+        self._cond = threading.Condition()
+        self.overflow = 0
+        self.max_fill = 0
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def put(self, lines, timestamp):
+        """写入同一次读取得到的若干行，返回实际写入的行数"""
+        with self._cond:
+            free = self.capacity - (self._head - self._tail)
+            if len(lines) > free:
+                self.overflow += len(lines) - free
+                lines = lines[:free]
+            for line in lines:
+                slot = self._head % self.capacity
+                self._lines[slot] = line
+                self._stamps[slot] = timestamp
+                self._head += 1
+            self.max_fill = max(self.max_fill, self._head - self._tail)
+            if lines:
+                self._cond.notify()
+            return len(lines)
+
+    def get_batch(self, max_items, timeout=None):
+        """取出最多 max_items 行，缓冲区为空时最多等待 timeout 秒"""
+        with self._cond:
+            if self._head == self._tail:
+                self._cond.wait(timeout)
+            batch = []
+            for _ in range(min(self._head - self._tail, max_items)):
+                slot = self._tail % self.capacity
+                batch.append((self._stamps[slot], self._lines[slot]))
+                self._lines[slot] = None
+                self._tail += 1
+            return batch
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+class LatestFrame:
+    """只保存最新一帧的槽，给界面显示用：写入方（解析线程）直接覆盖，不加锁也不等待，
+    读取方按自己的节奏取最新的一帧，来不及显示的帧直接跳过。
+    (序号, 时间, 帧索引, 点) 作为一个元组整体替换，读取方不会看到写了一半的数据"""
+
+    def __init__(self):
+        self._latest = (0, 0.0, 0, None)
+
+    def put(self, timestamp, frame_index, points):
+        # 只有一个写入方，序号自增不会冲突；签名与 RecordingPipeline.frame_callbacks 一致
+        self._latest = (self._latest[0] + 1, timestamp, frame_index, points)
+
+    def get(self):
+        """返回 (序号, 时间, 帧索引, 点)，序号为 0 表示还没有数据"""
+        return self._latest
+
+
+class RecordingPipeline:
+    """从串口录制点云到 .pcr 文件的三级流水线，stats() 返回各级的计数"""
+
+    def __init__(self, com_port, baud_rate, file_path, ring_capacity=4096, queue_size=1024,
+                 write_batch=64, flush_interval=1.0, max_frames=0):
+        self.com_port = com_port
+        self.baud_rate = baud_rate
+        self.file_path = file_path
+        self.write_batch = write_batch
+        self.flush_interval = flush_interval
+        self.max_frames = max_frames  # 写满这么多帧后停止写入，0 表示不限
+
+        self.line_ring = LineRing(ring_capacity)
+        self.frame_queue = queue.Queue(maxsize=queue_size)
+        self.parse_stats = ParseStats()
+        self.frame_callbacks = []  # 解析线程里对每一帧调用 callback(timestamp, frame_index, points)
+
+        self.bytes_received = 0
+        self.lines_received = 0
+        self.garbage_bytes = 0
+        self.frames_dropped = 0
+        self.frames_written = 0
+        self.points_written = 0
+        self.bytes_written = 0
+        self.error = None
+        self.finished = threading.Event()  # 达到 max_frames 时置位
+
+        self._serial = None
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._reader_done = threading.Event()
+
+    def start(self):
+        if self.com_port.startswith(HUB_SCHEME):
+            self._threads = [
+                threading.Thread(target=self._hub_loop, name='hub-subscriber', daemon=True),
+                threading.Thread(target=self._write_loop, name='frame-writer', daemon=True),
+            ]
+        else:
+            # 在调用方线程里打开串口，打不开时直接抛异常
+            self._serial = serial.Serial(self.com_port, self.baud_rate, timeout=0.1)
+            self._threads = [
+                threading.Thread(target=self._read_loop, name='serial-reader', daemon=True),
+                threading.Thread(target=self._parse_loop, name='frame-parser', daemon=True),
+                threading.Thread(target=self._write_loop, name='frame-writer', daemon=True),
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """停止读串口，等已经读到的数据全部解析、写入文件后返回"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._serial is not None:
+            self._serial.close()
+            self._serial = None
+
+    def _read_loop(self):
+        reader = SerialLineReader(self._serial)
+        try:
+            while not self._stop_event.is_set():
+                timestamp, lines = reader.read_lines()
+                self.bytes_received = reader.bytes_received
+                self.lines_received = reader.lines_received
+                self.garbage_bytes = reader.garbage_bytes
+                if lines:
+                    self.line_ring.put(lines, timestamp)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._reader_done.set()
+            self.line_ring.wake()
+
+    def _parse_loop(self):
+        try:
+            while True:
+                batch = self.line_ring.get_batch(256, timeout=0.1)
+                if not batch:
+                    if self._reader_done.is_set() and len(self.line_ring) == 0:
+                        break
+                    continue
+                for timestamp, line in batch:
+                    parsed = parse_line(line, self.parse_stats)
+                    if parsed is None:
+                        continue
+                    frame_index, points = parsed
+                    for callback in self.frame_callbacks:
+                        callback(timestamp, frame_index, points)
+                    try:
+                        self.frame_queue.put_nowait((timestamp, frame_index, points))
+                    except queue.Full:
+                        self.frames_dropped += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self.frame_queue.put(None)
+
+    def _hub_loop(self):
+        client = HubClient(self.com_port, stop_event=self._stop_event)
+        try:
+            for timestamp, frame_index, points in client.frames():
+                self.bytes_received = client.bytes_received
+                self.parse_stats.frames += 1
+                self.parse_stats.points += len(points)
+                for callback in self.frame_callbacks:
+                    callback(timestamp, frame_index, points)
+                try:
+                    self.frame_queue.put_nowait((timestamp, frame_index, points))
+                except queue.Full:
+                    self.frames_dropped += 1
+            if not self._stop_event.is_set():
+                raise ConnectionError('serial_hub 断开')
+        except Exception as e:
+            self.error = e
+        finally:
+            self._reader_done.set()
+            self.frame_queue.put(None)
+
+    def _write_loop(self):
+        try:
+            with PointCloudWriter(self.file_path) as writer:
+                last_flush = time.time()
+                done = False
+                while not done:
+                    try:
+                        batch = [self.frame_queue.get(timeout=self.flush_interval)]
+                    except queue.Empty:
+                        batch = []
+                    # 把队列里已经到达的帧一次取完，批量写入
+                    while batch and len(batch) < self.write_batch:
+                        try:
+                            batch.append(self.frame_queue.get_nowait())
+                        except queue.Empty:
+                            break
+
+                    for frame in batch:
+                        if frame is None:
+                            done = True
+                            break
+                        if self.max_frames and self.frames_written >= self.max_frames:
+                            continue
+                        timestamp, frame_index, points = frame
+                        writer.write_frame(points, timestamp, frame_index)
+                        self.frames_written += 1
+                        self.points_written += len(points)
+                        if self.frames_written == self.max_frames:
+                            self.finished.set()
+                    self.bytes_written = writer.bytes_written
+
+                    if time.time() - last_flush >= self.flush_interval:
+                        writer.flush()
+                        last_flush = time.time()
+        except Exception as e:
+            self.error = e
+            # 写文件出错后继续取走队列里的数据，避免解析线程在结束时阻塞
+            while self.frame_queue.get() is not None:
+                pass
+
+    def stats(self):
+        return {
+            'bytes_received': self.bytes_received,
+            'lines_received': self.lines_received,
+            'garbage_bytes': self.garbage_bytes,
+            'ring_fill': len(self.line_ring),
+            'ring_max_fill': self.line_ring.max_fill,
+            'ring_overflow': self.line_ring.overflow,
+            'frames_parsed': self.parse_stats.frames,
+            'points_parsed': self.parse_stats.points,
+            'parse_errors': self.parse_stats.malformed,
+            'queue_size': self.frame_queue.qsize(),
+            'frames_dropped': self.frames_dropped,
+            'frames_written': self.frames_written,
+            'points_written': self.points_written,
+            'bytes_written': self.bytes_written,
+        }
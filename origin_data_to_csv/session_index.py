@@ -0,0 +1,169 @@
+# 录制文件索引：把数据目录下每个录制文件的元数据存进一个 SQLite 文件（数据目录/.radar_index.sqlite）。
+#
+# 元数据一部分从文件名解析（RadarRecorderGUI 生成的文件名：
+# pointCloud_日期_时间.毫秒_用户名_动作_count序号.pcr），一部分要读文件统计（帧数、点数）。
+# update() 只处理新增或修改过（mtime / 大小变化）的文件，删除已经不存在的文件的记录；
+# 同一次录制同时有 .csv 和 .pcr（pointcloud_io 转换过）时只索引 .pcr，免得同一录制被当成两个文件。
+# RadarDataset 用 query() 的结果挑选文件，不需要手工维护文件列表。
+import os
+import re
+import sys
+import time
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from pointcloud_io import PointCloudRecording, iter_csv_frames, PCR_SUFFIX
+
+INDEX_NAME = '.radar_index.sqlite'
+INDEX_VERSION = 2  # 文件名解析规则变化时加一，旧的索引会整体重建
+
+# 用户名里可能有下划线，动作取 count 前面的那一段，count 后面可能还有一段备注（如 _count4_henchang）；
+# 早期的文件没有 count，动作取最后一段
+NAME_PATTERN = re.compile(
+    r'^pointCloud_(\d{8}_\d{2}-\d{2}-\d{2})\.(\d{3})_'
+    r'(?:(.+?)_([^_]+)_count(\d+)(?:_[^.]+)?|(.+)_([^_]+))\.(?:csv|pcr)$')
+
+COLUMNS = ('name', 'user', 'action', 'count', 'timestamp', 'mtime_ns', 'size',
+           'frame_count', 'point_count', 'points_min', 'points_max', 'points_mean')
+
+
+def parse_session_name(filename):
+    """从文件名解析 {user, action, count, timestamp}，不符合命名规则时返回 None"""
+    match = NAME_PATTERN.match(filename)
+    if match is None:
+        return None
+    time_str, millis, user, action, count, old_user, old_action = match.groups()
+    if count is None:
+        user, action = old_user, old_action
+    timestamp = time.mktime(time.strptime(time_str, '%Y%m%d_%H-%M-%S')) + int(millis) / 1000
+    return {'user': user, 'action': action, 'count': int(count) if count else None, 'timestamp': timestamp}
+
+
+def scan_session(file_path):
+    """统计一个录制文件的帧数和每帧点数，.pcr 只读文件末尾的索引"""
+    if file_path.endswith(PCR_SUFFIX):
+        point_nums = np.asarray(PointCloudRecording(file_path).point_nums)
+    else:
+        point_nums = np.array([len(points) for _, points in iter_csv_frames(file_path)], dtype=np.int64)
+    if len(point_nums) == 0:
+        return {'frame_count': 0, 'point_count': 0, 'points_min': 0, 'points_max': 0, 'points_mean': 0.0}
+    return {
+        'frame_count': len(point_nums),
+        'point_count': int(point_nums.sum()),
+        'points_min': int(point_nums.min()),
+        'points_max': int(point_nums.max()),
+        'points_mean': float(point_nums.mean()),
+    }
+
+
+def _scan_task(task):
+    name, file_path, mtime_ns, size = task
+    row = {'name': name, 'mtime_ns': mtime_ns, 'size': size}
+    row.update(parse_session_name(name))
+    row.update(scan_session(file_path))
+    return row
+
+
+class SessionIndex:
+    def __init__(self, data_dir, index_path=None):
+        self.data_dir = data_dir
+        self.index_path = index_path or os.path.join(data_dir, INDEX_NAME)
+        self.conn = sqlite3.connect(self.index_path)
+        self.conn.row_factory = sqlite3.Row
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] < INDEX_VERSION:
+            # 旧版本解析出的用户名 / 动作可能不对，文件没变也不会重新扫描，直接清空重建
+            self.conn.execute('DROP TABLE IF EXISTS sessions')
+            self.conn.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                name TEXT PRIMARY KEY, user TEXT, action TEXT, count INTEGER, timestamp REAL,
+                mtime_ns INTEGER, size INTEGER, frame_count INTEGER, point_count INTEGER,
+                points_min INTEGER, points_max INTEGER, points_mean REAL)''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS sessions_action ON sessions (action)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS sessions_user ON sessions (user)')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def update(self, num_workers=0):
+        """扫描数据目录，只统计新增或修改过的文件，返回 (新增, 更新, 删除) 的文件数"""
+        known = {row['name']: (row['mtime_ns'], row['size'])
+                 for row in self.conn.execute('SELECT name, mtime_ns, size FROM sessions')}
+        sessions = {}  # 去掉扩展名的文件名 -> DirEntry，同名的 .csv 和 .pcr 只留 .pcr
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or parse_session_name(entry.name) is None:
+                    continue
+                stem = os.path.splitext(entry.name)[0]
+                if stem not in sessions or entry.name.endswith(PCR_SUFFIX):
+                    sessions[stem] = entry
+
+        tasks = []
+        present = set()
+        added = 0
+        for entry in sessions.values():
+            present.add(entry.name)
+            stat = entry.stat()
+            if known.get(entry.name) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            added += entry.name not in known
+            tasks.append((entry.name, entry.path, stat.st_mtime_ns, stat.st_size))
+
+        if num_workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                rows = list(executor.map(_scan_task, tasks, chunksize=max(1, len(tasks) // (num_workers * 4))))
+        else:
+            rows = [_scan_task(task) for task in tasks]
+
+        removed = [(name,) for name in known if name not in present]
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO sessions ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join(':' + column for column in COLUMNS)})", rows)
+            self.conn.executemany('DELETE FROM sessions WHERE name = ?', removed)
+        return added, len(rows) - added, len(removed)
+
+    def query(self, users=None, actions=None, min_frames=0, since=None, until=None):
+        """按条件挑选文件，返回按录制时间排序的行（sqlite3.Row，可以按列名取值）。
+        users / actions 为列表时取其中任意一个，since / until 为 Unix 时间戳"""
+        conditions = ['frame_count >= ?']
+        args = [min_frames]
+        if users is not None:
+            conditions.append(f"user IN ({', '.join('?' * len(users))})")
+            args.extend(users)
+        if actions is not None:
+            conditions.append(f"action IN ({', '.join('?' * len(actions))})")
+            args.extend(actions)
+        if since is not None:
+            conditions.append('timestamp >= ?')
+            args.append(since)
+        if until is not None:
+            conditions.append('timestamp < ?')
+            args.append(until)
+        sql = f"SELECT * FROM sessions WHERE {' AND '.join(conditions)} ORDER BY timestamp, name"
+        return self.conn.execute(sql, args).fetchall()
+
+    def files(self, **conditions):
+        """query() 结果的文件名列表，可以直接作为 RadarDataset 的 data_txt"""
+        return [row['name'] for row in self.query(**conditions)]
+
+
+if __name__ == '__main__':
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else './fall_bed_data3'
+    with SessionIndex(data_dir) as index:
+        start = time.perf_counter()
+        added, updated, removed = index.update(num_workers=os.cpu_count() or 1)
+        print(f"新增 {added}, 更新 {updated}, 删除 {removed}, 耗时 {time.perf_counter() - start:.2f}s")
+        print(f"{'用户':>8} {'动作':>10} {'文件数':>6} {'帧数':>8} {'平均点数':>8}")
+        for row in index.conn.execute('''
+                SELECT user, action, COUNT(*) AS files, SUM(frame_count) AS frames,
+                       SUM(point_count) * 1.0 / MAX(SUM(frame_count), 1) AS mean_points
+                FROM sessions GROUP BY user, action ORDER BY user, action'''):
+            print(f"{row['user']:>8} {row['action']:>10} {row['files']:>6} {row['frames']:>8} {row['mean_points']:>8.1f}")
@@ -0,0 +1,189 @@
+# 实时坠床检测：从串口（或 read_serial.py 转发的 TCP 数据流、或 .pcr 录制文件回放）逐帧读取点云，
+# 维护最近 window 帧的滑动窗口，每来 hop 帧做一次推理，输出坠床概率和端到端延迟。
+# 全部在 CPU 上运行，输入张量预先分配好，推理时只往里拷贝数据。
+#
+# 用法：python stream_infer.py 模型checkpoint 数据源 [模型名称]
+#   数据源：COM30 之类的串口名、tcp://127.0.0.1:7777（接收 read_serial.py 发出的数据包）、
+#          hub://127.0.0.1:7790（订阅 serial_hub.py）或 .pcr 文件
+import sys
+import time
+import socket
+import struct
+from collections import deque, namedtuple
+import numpy as np
+import serial
+import torch
+from model import load_checkpoint
+from preprocess import process_pointcloud
+from pointcloud_io import PointCloudRecording
+from radar_parser import ParseStats, parse_line
+from serial_hub import HUB_SCHEME, hub_frames
+from packet_io import recv_exact
+
+FALL_CLASS = 1  # RadarDataset.action_mapping 里坠床类动作的标签
+PACKET_HEADER = struct.Struct('<II')  # read_serial.py 发出的包头：帧索引, 点数
+
+InferenceResult = namedtuple('InferenceResult', ['timestamp', 'frame_index', 'fall_prob', 'latency', 'model_time'])
+
+
+class FrameWindow:
+    """一路数据流最近 window 帧预处理后的结果，环形存放"""
+
+    def __init__(self, params, window=1, hop=1):
+        self.params = params
+        self.window = window
+        self.hop = hop  # 每 hop 帧产生一个窗口
+        self._frames = np.zeros((window, params['max_points'], 5), dtype=np.float32)
+        self._pos = 0
+        self._count = 0
+
+    def push(self, points):
+        """送入一帧，窗口已满且到了间隔时返回 True"""
+        self._frames[self._pos] = process_pointcloud(points, **self.params)
+        self._pos = (self._pos + 1) % self.window
+        self._count += 1
+        return self._count >= self.window and (self._count - self.window) % self.hop == 0
+
+    def copy_into(self, out):
+        """按时间顺序把窗口拷进 out（(window, max_points, 5)），最旧的一帧在 _pos 处"""
+        older = self.window - self._pos
+        out[:older] = self._frames[self._pos:]
+        out[older:] = self._frames[:self._pos]
+
+
+def input_view(tensor, window, max_points):
+    """模型输入 (batch, 5, window * max_points) 按 (batch, window, max_points, 5) 排列的 numpy 视图"""
+    return tensor.numpy().transpose(0, 2, 1).reshape(len(tensor), window, max_points, 5)
+
+
+class StreamingInference:
+    def __init__(self, model, params, window=1, hop=1):
+        self.model = model.to('cpu').eval()
+        self.params = params
+        self.window = window
+        self.frames = FrameWindow(params, window, hop)
+        # 预先分配的模型输入 (1, 5, window * max_points)
+        self._input = torch.zeros((1, 5, window * params['max_points']), dtype=torch.float32)
+        self._window_view = input_view(self._input, window, params['max_points'])[0]
+
+        self.latencies = deque(maxlen=1000)
+        self.model_times = deque(maxlen=1000)
+
+    def push(self, timestamp, frame_index, points):
+        """送入一帧，timestamp 为该帧从串口收到的时间（time.time()）。
+        窗口已满且到了推理间隔时返回 InferenceResult，否则返回 None"""
+        if not self.frames.push(points):
+            return None
+        self.frames.copy_into(self._window_view)
+
+        start = time.perf_counter()
+        with torch.inference_mode():
+            logits = self.model(self._input)
+            fall_prob = torch.softmax(logits, dim=1)[0, FALL_CLASS].item()
+        model_time = time.perf_counter() - start
+        latency = time.time() - timestamp
+
+        self.latencies.append(latency)
+        self.model_times.append(model_time)
+        return InferenceResult(timestamp, frame_index, fall_prob, latency, model_time)
+
+    def latency_summary(self):
+        """最近 1000 次推理的延迟统计（毫秒）"""
+        if not self.latencies:
+            return {}
+        latencies = np.array(self.latencies) * 1000
+        model_times = np.array(self.model_times) * 1000
+        return {
+            'latency_p50': float(np.percentile(latencies, 50)),
+            'latency_p95': float(np.percentile(latencies, 95)),
+            'latency_max': float(latencies.max()),
+            'model_p50': float(np.percentile(model_times, 50)),
+            'model_p95': float(np.percentile(model_times, 95)),
+        }
+
+
+def serial_frames(com_port, baud_rate=921600):
+    """从串口逐帧读取，返回 (接收时间, frame_index, points)"""
+    stats = ParseStats()
+    ser = serial.Serial(com_port, baud_rate, timeout=1)
+    try:
+        while True:
+            line = ser.readline()
+            timestamp = time.time()
+            parsed = parse_line(line, stats)
+            if parsed is not None:
+                yield (timestamp,) + parsed
+    finally:
+        ser.close()
+
+
+def tcp_frames(host='127.0.0.1', port=7777):
+    """作为服务端接收 read_serial.py 发出的数据包（包头 <II + point_num 个 5*int16），返回 (接收时间, frame_index, points)"""
+    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_sock.bind((host, port))
+    server_sock.listen(1)
+    print(f"[Infer] Listening on {host}:{port}...")
+    header = bytearray(PACKET_HEADER.size)
+    try:
+        while True:
+            conn, addr = server_sock.accept()
+            print(f"[Infer] Connected from {addr}")
+            with conn:
+                while recv_exact(conn, memoryview(header)):
+                    frame_index, point_num = PACKET_HEADER.unpack(header)
+                    body = bytearray(point_num * 10)
+                    if not recv_exact(conn, memoryview(body)):
+                        break
+                    points = np.frombuffer(body, dtype='<i2').reshape(point_num, 5)
+                    yield time.time(), frame_index, points
+            print("[Infer] Client disconnected.")
+    finally:
+        server_sock.close()
+
+
+def replay_frames(pcr_path, realtime=True):
+    """回放 .pcr 录制文件，realtime 为 True 时按录制时的帧间隔送出；接收时间取送出的时刻"""
+    recording = PointCloudRecording(pcr_path)
+    start = time.time()
+    for i in range(len(recording)):
+        if realtime:
+            delay = recording.timestamps[i] - recording.timestamps[0] - (time.time() - start)
+            if delay > 0:
+                time.sleep(delay)
+        yield time.time(), int(recording.frame_indices[i]), recording.frame(i)
+
+
+def open_source(source):
+    if source.startswith('tcp://'):
+        host, port = source[len('tcp://'):].rsplit(':', 1)
+        return tcp_frames(host, int(port))
+    if source.startswith(HUB_SCHEME):
+        return hub_frames(source)
+    if source.endswith('.pcr'):
+        return replay_frames(source)
+    return serial_frames(source)
+
+
+if __name__ == '__main__':
+    checkpoint_path = sys.argv[1]
+    source = sys.argv[2] if len(sys.argv) > 2 else 'COM30'
+    model_name = sys.argv[3] if len(sys.argv) > 3 else None
+    threshold = 0.5
+
+    torch.set_num_threads(1)  # 单帧推理计算量很小，多线程反而增加调度开销
+    model, params, window = load_checkpoint(checkpoint_path, model_name)
+    engine = StreamingInference(model, params, window)
+
+    try:
+        for timestamp, frame_index, points in open_source(source):
+            result = engine.push(timestamp, frame_index, points)
+            if result is None:
+                continue
+            flag = '  <-- 坠床' if result.fall_prob >= threshold else ''
+            print(f"Frame #{result.frame_index}: fall={result.fall_prob:.3f}, "
+                  f"latency={result.latency * 1000:.1f}ms, model={result.model_time * 1000:.2f}ms{flag}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"延迟统计(ms): {engine.latency_summary()}")
@@ -0,0 +1,148 @@
+# serial_hub 的测试：用假串口代替雷达，检查分发、慢订阅者隔离和停止。
+#
+# 用法：python -m pytest test_serial_hub.py
+import time
+import queue
+import socket
+import threading
+import numpy as np
+import pytest
+import serial_hub
+from radar_parser import SerialLineReader
+from serial_hub import HUB_SCHEME, SerialHub, HubClient, Subscriber, encode_frame
+from serial_pipeline import RecordingPipeline
+
+
+class FakeSerial:
+    """按顺序返回预先放进去的数据块，没有数据时和真串口一样等到超时返回 b''"""
+
+    def __init__(self, *args, timeout=0.1, **kwargs):
+        self.chunks = queue.Queue()
+        self.timeout = timeout
+        FakeSerial.last = self
+
+    @property
+    def in_waiting(self):
+        return 0
+
+    def read(self, size=1):
+        try:
+            return self.chunks.get(timeout=self.timeout)
+        except queue.Empty:
+            return b''
+
+    def close(self):
+        pass
+
+
+def frame_line(frame_index, point_num):
+    values = [frame_index, point_num] + [frame_index % 100 + i for i in range(point_num * 5)]
+    return (','.join(map(str, values)) + ',\r\n').encode()
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError('等待超时')
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    monkeypatch.setattr(serial_hub.serial, 'Serial', FakeSerial)
+    hub = SerialHub('FAKE', port=0)
+    hub.start()
+    yield hub
+    if hub._threads:
+        hub.stop()
+
+
+def hub_url(hub):
+    return f"{HUB_SCHEME}{hub.address[0]}:{hub.address[1]}"
+
+
+def collect(url, count, results):
+    for frame in HubClient(url).frames():
+        results.append(frame)
+        if len(results) == count:
+            break
+
+
+def test_line_reader_splits_chunks_and_drops_garbage():
+    fake = FakeSerial()
+    for chunk in [b'1,0', b',\n2,0,\n3,', b'0,\n', b'x' * (70 * 1024), b'']:
+        fake.chunks.put(chunk)
+    reader = SerialLineReader(fake)
+    lines = []
+    for _ in range(5):
+        lines += reader.read_lines()[1]
+    assert lines == [b'1,0,', b'2,0,', b'3,0,']
+    assert reader.lines_received == 3
+    assert reader.garbage_bytes == 70 * 1024
+
+
+def test_every_subscriber_gets_every_frame(hub):
+    url = hub_url(hub)
+    results = [[], []]
+    clients = [threading.Thread(target=collect, args=(url, 20, r), daemon=True) for r in results]
+    for client in clients:
+        client.start()
+    wait_until(lambda: len(hub.subscribers) == 2)
+
+    lines = b''.join(frame_line(i, i % 4) for i in range(20))
+    # 故意在行中间切开，检查跨块拼行
+    for start in range(0, len(lines), 37):
+        FakeSerial.last.chunks.put(lines[start:start + 37])
+    for client in clients:
+        client.join(5)
+
+    for r in results:
+        assert [frame_index for _, frame_index, _ in r] == list(range(20))
+        assert r[5][2].shape == (1, 5)
+        assert r[5][2][0, 0] == 5
+    assert hub.parse_stats.frames == 20
+
+
+def test_slow_subscriber_only_drops_its_own_frames():
+    sock_a, sock_b = socket.socketpair()
+    subscriber = Subscriber(sock_a, 'slow', queue_size=4)
+    for i in range(10):
+        subscriber.offer(encode_frame(0.0, i, np.zeros((0, 5))))
+    assert subscriber.frames_dropped == 6
+    # 留下的是最新的 4 帧
+    remaining = [serial_hub.FRAME_HEADER.unpack(packet)[1] for packet in subscriber.packets.get_batch()]
+    assert remaining == [6, 7, 8, 9]
+    sock_a.close()
+    sock_b.close()
+
+
+def test_stop_joins_subscriber_threads(hub):
+    # 只连接不读，发送线程会卡在 sendall 里
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.connect(hub.address)
+    wait_until(lambda: len(hub.subscribers) == 1)
+    subscriber = hub.subscribers[0]
+    points = np.zeros((3000, 5), dtype=np.int16)
+    for i in range(1000):
+        hub.publish(0.0, i, points)
+    wait_until(lambda: subscriber.frames_dropped > 0)
+
+    hub.stop()
+    assert not subscriber.thread.is_alive()
+    assert hub.subscribers == ()
+    sock.close()
+
+
+def test_pipeline_reports_hub_disconnect(hub, tmp_path):
+    pipeline = RecordingPipeline(hub_url(hub), 921600, str(tmp_path / 'test.pcr'))
+    pipeline.start()
+    wait_until(lambda: len(hub.subscribers) == 1)
+    FakeSerial.last.chunks.put(frame_line(1, 1))
+    wait_until(lambda: pipeline.parse_stats.frames == 1)
+
+    hub.stop()
+    wait_until(lambda: pipeline.error is not None)
+    assert isinstance(pipeline.error, ConnectionError)
+    pipeline.stop()
@@ -0,0 +1,117 @@
+# 训练坠床检测模型。
+#
+# 按文件划分训练集/验证集（同一次录制不会同时出现在两边），DataLoader 多进程取样本，
+# collate_samples 把整批样本一次拷贝成张量；每个 epoch 打印 样本/秒、平均每步耗时和等数据的时间。
+# 训练结束保存验证集准确率最高的 checkpoint（模型名称、预处理参数、窗口长度和权重），
+# stream_infer.py / batch_infer.py / export_models.py 可以直接加载。
+#
+# 用法：python train.py 数据目录 [文件列表txt] [模型名称] [窗口帧数]
+#   文件列表txt 为 - 时使用 session_index 索引里数据目录下的全部文件
+import os
+import sys
+import time
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Subset
+from model import RadarDataset, MODELS, collate_samples, split_sessions
+from session_index import SessionIndex
+
+BATCH_SIZE = 64
+EPOCHS = 10
+LEARNING_RATE = 0.001
+MAX_POINTS = 30
+NUM_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def make_loader(dataset, indices, shuffle, device):
+    return DataLoader(Subset(dataset, indices), batch_size=BATCH_SIZE, shuffle=shuffle,
+                      num_workers=NUM_WORKERS, collate_fn=collate_samples,
+                      pin_memory=device.type == 'cuda', persistent_workers=NUM_WORKERS > 0)
+
+
+def train_epoch(model, loader, criterion, optimizer, device):
+    """训练一个 epoch，返回 (平均 loss, 样本/秒, 平均每步耗时, 平均等数据时间)"""
+    model.train()
+    total_loss = 0.0
+    samples = 0
+    step_time = 0.0
+    wait_time = 0.0
+    steps = 0
+    start = time.perf_counter()
+    wait_start = start
+    for inputs, labels in loader:
+        step_start = time.perf_counter()
+        wait_time += step_start - wait_start
+        inputs = inputs.to(device, non_blocking=True)
+        labels = labels.to(device, non_blocking=True)
+
+        outputs = model(inputs)
+        loss = criterion(outputs, labels)
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+
+        total_loss += loss.item() * len(labels)
+        samples += len(labels)
+        steps += 1
+        wait_start = time.perf_counter()
+        step_time += wait_start - step_start
+    elapsed = time.perf_counter() - start
+    return total_loss / max(samples, 1), samples / elapsed, step_time / max(steps, 1), wait_time / max(steps, 1)
+
+
+def evaluate(model, loader, device):
+    model.eval()
+    total = 0
+    correct = 0
+    with torch.inference_mode():
+        for inputs, labels in loader:
+            outputs = model(inputs.to(device, non_blocking=True))
+            correct += (outputs.argmax(dim=1).cpu() == labels).sum().item()
+            total += len(labels)
+    return correct / max(total, 1)
+
+
+if __name__ == "__main__":
+    data_dir = sys.argv[1]
+    data_txt = sys.argv[2] if len(sys.argv) > 2 else '-'
+    model_name = sys.argv[3] if len(sys.argv) > 3 else 'tcn'
+    window = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
+    if data_txt == '-':
+        with SessionIndex(data_dir) as index:
+            index.update(num_workers=NUM_WORKERS)
+            data_txt = index.files()
+
+    # 创建数据集，按文件划分训练集和验证集
+    dataset = RadarDataset(data_dir, data_txt, max_points=MAX_POINTS, num_workers=NUM_WORKERS, window=window)
+    train_indices, val_indices = split_sessions(dataset, test_size=0.2)
+    train_labels = np.bincount(dataset.window_labels[train_indices] if window else dataset.labels[train_indices],
+                               minlength=2)
+    print(f"{len(dataset.session_files)} 个文件, 训练样本 {len(train_indices)} (各类 {train_labels.tolist()}), "
+          f"验证样本 {len(val_indices)}")
+    train_loader = make_loader(dataset, train_indices, True, device)
+    val_loader = make_loader(dataset, val_indices, False, device)
+
+    # 模型初始化
+    model = MODELS[model_name](num_classes=2).to(device)
+    criterion = torch.nn.CrossEntropyLoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=LEARNING_RATE)
+
+    best_acc = -1.0
+    checkpoint_path = f"{model_name}_best.pt"
+    for epoch in range(EPOCHS):
+        loss, samples_per_sec, step_time, wait_time = train_epoch(model, train_loader, criterion, optimizer, device)
+        val_acc = evaluate(model, val_loader, device)
+        print(f"Epoch {epoch + 1}, Loss: {loss:.4f}, Val Acc: {val_acc:.3f}, "
+              f"{samples_per_sec:.0f} 样本/秒, 每步 {step_time * 1000:.1f}ms, 等数据 {wait_time * 1000:.1f}ms")
+        if val_acc > best_acc:
+            best_acc = val_acc
+            torch.save({
+                'model': model_name,
+                'state_dict': model.state_dict(),
+                'params': dataset.preprocess_params(),
+                'window': window,
+            }, checkpoint_path)
+    print(f"最佳验证准确率 {best_acc:.3f}，已保存到 {checkpoint_path}")
@@ -1,10 +1,17 @@
+import os
 import sys
-import csv
-import ast
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget
+import time
+import numpy as np
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QSlider, QPushButton,
+                             QLineEdit, QLabel, QCheckBox, QSpinBox)
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-from matplotlib.animation import FuncAnimation
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'origin_data_to_csv'))
+from pointcloud_io import open_recording, format_time_str, parse_time_str
+from density import TrailWindow
+from scatter_view import PointCloudScatterView
 
 ## 这个脚本的作用是从csv文件中读取电云数据并且展示在3D的图像中。
 
@@ -13,15 +20,57 @@ class PointCloudVisualizer(QMainWindow):
     def __init__(self, csv_file, fps=5):
         super().__init__()
         self.setWindowTitle("Point Cloud Visualizer")
-        self.resize(800, 600)
+        self.resize(1200, 600)
 
         # 初始化Matplotlib图形
         self.fig = Figure()
         self.canvas = FigureCanvas(self.fig)
-        self.ax = self.fig.add_subplot(111, projection='3d')
+        self.ax = self.fig.add_subplot(121, projection='3d')
+        self.heatmap_ax = self.fig.add_subplot(122)
+        # 整个播放过程只用一个散点对象，颜色按固定的 SNR 范围映射，帧与帧之间颜色可比
+        self.view = PointCloudScatterView(self.canvas, self.ax, on_drawn=self.count_frame)
+        self.init_axes()
+        self.draw_count = 0
+        self.display_fps = 0.0
+        self.fps_start = time.perf_counter()
+
+        # 读取点云数据：只建立帧索引（CSV 的索引缓存在文件旁边），每帧在显示时才解析
+        self.recording = self.load_pointcloud_data(csv_file)
+        self.frame_idx = 0
+        # 累积模式：最近 N 帧的轨迹画在 3D 图里，密度画成右边的 XY 热力图
+        self.trail = TrailWindow(self.recording, length=50)
+        self.heatmap.set_extent(self.trail.grid.extent)
+
+        # 进度条、播放/暂停、跳转到指定时间
+        self.slider = QSlider(Qt.Horizontal)
+        self.slider.setRange(0, max(len(self.recording) - 1, 0))
+        self.slider.valueChanged.connect(self.update_frame)
+        self.play_button = QPushButton('暂停')
+        self.play_button.clicked.connect(self.toggle_play)
+        self.time_input = QLineEdit()
+        self.time_input.setPlaceholderText('跳转到 HH:MM:SS 或 YYYY-mm-dd HH:MM:SS')
+        self.time_input.returnPressed.connect(self.jump_to_time)
+        self.time_label = QLabel()
+        self.accumulate_box = QCheckBox('累积')
+        self.accumulate_box.setChecked(True)
+        self.accumulate_box.toggled.connect(lambda _: self.update_frame(self.frame_idx))
+        self.trail_spin = QSpinBox()
+        self.trail_spin.setRange(1, 10000)
+        self.trail_spin.setValue(self.trail.length)
+        self.trail_spin.setSuffix(' 帧')
+        self.trail_spin.valueChanged.connect(self.set_trail_length)
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.play_button)
+        controls.addWidget(self.slider, 1)
+        controls.addWidget(self.time_label)
+        controls.addWidget(self.time_input)
+        controls.addWidget(self.accumulate_box)
+        controls.addWidget(self.trail_spin)
 
         layout = QVBoxLayout()
         layout.addWidget(self.canvas)
+        layout.addLayout(controls)
 
         widget = QWidget()
         widget.setLayout(layout)
@@ -30,51 +79,92 @@ class PointCloudVisualizer(QMainWindow):
         self.frames_per_second = fps
         self.frame_interval = 1000 // self.frames_per_second
 
-        # 读取CSV点云数据
-        self.all_frames = self.load_pointcloud_data(csv_file)
+        # 启动播放
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.next_frame)
+        self.timer.start(self.frame_interval)
+        if len(self.recording):
+            self.update_frame(0)
 
-        # 启动动画
-        self.anim = FuncAnimation(self.fig, self.update_frame,
-                                  frames=len(self.all_frames),
-                                  interval=self.frame_interval,
-                                  repeat=False)
-        self.canvas.draw()
+    def init_axes(self):
+        # 轨迹和热力图也只创建一次，每帧更新数据，和散点一起用 blit 重画
+        self.trail_scatter = self.ax.scatter([], [], [], c='gray', s=4, alpha=0.2, depthshade=False, animated=True)
+        self.heatmap = self.heatmap_ax.imshow(np.zeros((1, 1)), origin='lower', cmap='inferno', animated=True,
+                                              interpolation='nearest')
+        self.view.add_artist(self.trail_scatter)
+        self.view.add_artist(self.heatmap, self.heatmap_ax)
+        self.heatmap_ax.set_xlabel("X")
+        self.heatmap_ax.set_ylabel("Y")
+        self.heatmap_ax.set_title("XY density")
 
     def load_pointcloud_data(self, csv_file):
-        all_frames = []
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader)
-            next(reader)
-            for row in reader:
-                pointcloud_list = ast.literal_eval(row[1])
-                # for i in range(0, len(pointcloud_list), 5):
-                #     frame = pointcloud_list[i:i + 5]
-                all_frames.append(pointcloud_list)
-        return all_frames
+        return open_recording(csv_file)
+
+    def next_frame(self):
+        if self.frame_idx + 1 >= len(self.recording):
+            self.toggle_play()
+            return
+        self.slider.setValue(self.frame_idx + 1)  # 通过 valueChanged 调用 update_frame
+
+    def toggle_play(self):
+        if self.timer.isActive():
+            self.timer.stop()
+            self.play_button.setText('播放')
+        else:
+            if self.frame_idx + 1 >= len(self.recording):
+                self.slider.setValue(0)
+            self.timer.start(self.frame_interval)
+            self.play_button.setText('暂停')
+
+    def jump_to_time(self):
+        text = self.time_input.text().strip()
+        if not text or not len(self.recording):
+            return
+        if len(text) <= len('HH:MM:SS.mmm'):
+            # 只给了时分秒，日期取录制开始的那天
+            text = format_time_str(self.recording.timestamps[0])[:10] + ' ' + text
+        try:
+            timestamp = parse_time_str(text)
+        except ValueError:
+            self.time_input.selectAll()
+            return
+        self.slider.setValue(self.recording.seek_time(timestamp))
 
     def update_frame(self, frame_idx):
-        self.ax.clear()
-        frame = self.all_frames[frame_idx]
-
-        xs, ys, zs, snrs = [], [], [], []
-        for point in frame:
-            if len(point) == 5:
-                x, y, z, v, snr = point
-                xs.append(x)
-                ys.append(y)
-                zs.append(z)
-                snrs.append(snr)
-
-        self.ax.scatter(xs, ys, zs, c=snrs, cmap='viridis', s=20)
-        self.ax.set_xlim(-500, 800)
-        self.ax.set_ylim(-500, 800)
-        self.ax.set_zlim(-200, 200)
-        self.ax.set_title(f"Frame {frame_idx + 1}/{len(self.all_frames)}")
-        self.ax.set_xlabel("X")
-        self.ax.set_ylabel("Y")
-        self.ax.set_zlabel("Z")
+        self.frame_idx = frame_idx
+        frame = self.recording.frame(frame_idx)
+        # 只更新散点的坐标和颜色，坐标轴、标签、范围只设置一次
+        self.view.set_points(frame)
+        self.view.title.set_text(f"Frame {frame_idx + 1}/{len(self.recording)}")
+        self.update_accumulation(frame_idx)
+        self.time_label.setText(f"{format_time_str(self.recording.timestamps[frame_idx])[11:]}  "
+                                f"{self.display_fps:.1f} FPS")
+        self.view.refresh()
+
+    def update_accumulation(self, frame_idx):
+        if self.accumulate_box.isChecked():
+            self.trail.move_to(frame_idx)
+            trail_points = self.trail.points.astype(np.float32)
+            density = self.trail.grid.xy()
+        else:
+            trail_points = np.empty((0, 5), dtype=np.float32)
+            density = np.zeros(self.trail.grid.shape[1::-1], dtype=np.int32)
+        self.trail_scatter._offsets3d = (trail_points[:, 0], trail_points[:, 1], trail_points[:, 2])
+        self.heatmap.set_data(density)
+        self.heatmap.set_clim(0, max(int(density.max()), 1))
+
+    def set_trail_length(self, length):
+        self.trail.set_length(length)
+        self.update_frame(self.frame_idx)
 
+    def count_frame(self):
+        """统计实际绘制的帧率，每秒刷新一次显示"""
+        self.draw_count += 1
+        now = time.perf_counter()
+        if now - self.fps_start >= 1.0:
+            self.display_fps = self.draw_count / (now - self.fps_start)
+            self.draw_count = 0
+            self.fps_start = now
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -4,10 +4,12 @@ import struct
 from PyQt5.QtWidgets import QApplication, QMainWindow, QGraphicsScene, QGraphicsView, QGraphicsEllipseItem, QGraphicsTextItem
 from PyQt5.QtGui import QBrush, QColor
 from PyQt5.QtCore import Qt, QTimer, QPointF
+from state_server import decode_targets, LEGACY_TARGET_DTYPE
 
 FRAME_HEADER = 0xAA55
-TARGET_STRUCT_FORMAT = '<HHI fff fff fff'
-TARGET_STRUCT_SIZE = struct.calcsize(TARGET_STRUCT_FORMAT)
+FRAME_MAGIC = struct.pack('<H', FRAME_HEADER)
+HEADER = struct.Struct('<HH')  # 帧头 0xAA55 + 数据长度
+MAX_FRAME_SIZE = HEADER.size + 0xFFFF
 
 class PointCloudGUI(QMainWindow):
     def __init__(self):
@@ -21,10 +23,11 @@ class PointCloudGUI(QMainWindow):
 
         self.scale_factor = 5  # 缩放比例，方便显示
 
-    def update_points(self, points):
+    def update_points(self, targets):
+        """targets：decode_targets 得到的结构化数组"""
         self.scene.clear()
-        for point in points:
-            tid, x, y, z = point
+        for tid, x, y, z in zip(targets['tid'].tolist(), targets['posX'].tolist(),
+                                targets['posY'].tolist(), targets['posZ'].tolist()):
             ellipse = QGraphicsEllipseItem(x * self.scale_factor, -y * self.scale_factor, 6, 6)
             ellipse.setBrush(QBrush(QColor("blue")))
             self.scene.addItem(ellipse)
@@ -34,16 +37,62 @@ class PointCloudGUI(QMainWindow):
             self.scene.addItem(text)
 
 def handle_packet(packet_data):
-    target_num = struct.unpack_from('B', packet_data, 0)[0]
-    points = []
+    # 每个目标 '<HHI fff fff fff'，整个数据体直接看成结构化数组
+    return decode_targets(packet_data, LEGACY_TARGET_DTYPE)
+
+class FrameBuffer:
+    """TCP 流分帧：固定大小的 bytearray，recv_into 直接写进空闲部分，不拼接 bytes。
+    读到末尾时把剩下的半帧挪到开头（每个字节最多挪一次）；帧头不对时用 find 一次跳到下一个 0xAA55"""
+
+    def __init__(self, capacity=1 << 18):
+        self.buffer = bytearray(max(capacity, 2 * MAX_FRAME_SIZE))
+        self.view = memoryview(self.buffer)
+        self.start = 0  # 未处理数据的起点
+        self.end = 0    # 未处理数据的终点
+        self.bytes_received = 0
+        self.frames = 0
+        self.resync_count = 0  # 帧头错误的次数
+        self.resync_bytes = 0  # 为了重新对齐丢掉的字节数
+
+    def recv_from(self, sock):
+        """从 socket 读一次，返回读到的字节数，0 表示连接断开"""
+        if len(self.buffer) - self.end < MAX_FRAME_SIZE:
+            pending = self.end - self.start
+            self.buffer[:pending] = self.buffer[self.start:self.end]
+            self.start, self.end = 0, pending
+        n = sock.recv_into(self.view[self.end:])
+        self.end += n
+        self.bytes_received += n
+        return n
+
+    def frames_available(self):
+        """依次返回缓冲区里完整帧的数据体（memoryview，下一次 recv_from 之前有效）"""
+        buffer = self.buffer
+        while self.end - self.start >= HEADER.size:
+            header, length = HEADER.unpack_from(buffer, self.start)
+            if header != FRAME_HEADER:
+                pos = buffer.find(FRAME_MAGIC, self.start + 1, self.end)
+                if pos < 0:
+                    # 最后一个字节可能是下一个帧头的前半个
+                    pos = self.end - 1 if buffer[self.end - 1] == FRAME_MAGIC[0] else self.end
+                self.resync_count += 1
+                self.resync_bytes += pos - self.start
+                self.start = pos
+                continue
+            frame_end = self.start + HEADER.size + length
+            if frame_end > self.end:
+                break
+            body = self.view[self.start + HEADER.size:frame_end]
+            self.start = frame_end
+            self.frames += 1
+            yield body
+        if self.start == self.end:
+            self.start = self.end = 0
+
+    def stats(self):
+        return {'bytes_received': self.bytes_received, 'frames': self.frames,
+                'resync_count': self.resync_count, 'resync_bytes': self.resync_bytes}
 
-    offset = 1
-    for _ in range(target_num):
-        target_data = packet_data[offset: offset + TARGET_STRUCT_SIZE]
-        tid, state, numPoints, posX, posY, posZ, *_ = struct.unpack(TARGET_STRUCT_FORMAT, target_data)
-        points.append((tid, posX, posY, posZ))
-        offset += TARGET_STRUCT_SIZE
-    return points
 
 def start_tcp_server(gui_window, host='127.0.0.1', port=8899):
     def server_loop():
@@ -55,30 +104,20 @@ def start_tcp_server(gui_window, host='127.0.0.1', port=8899):
         conn, addr = server_sock.accept()
         print(f"[TCP Server] Connected by {addr}")
 
-        buffer = b''
+        frames = FrameBuffer()
+        resync_count = 0
         while True:
-            data = conn.recv(1024)
-            # print(data)
-            if not data:
-                print("客户端断开连接")
+            if not frames.recv_from(conn):
+                print(f"客户端断开连接 {frames.stats()}")
                 break
-            buffer += data
-
-            while True:
-                if len(buffer) < 4:
-                    break
-                header, length = struct.unpack_from('<HH', buffer, 0)
-                if header != FRAME_HEADER:
-                    print("帧头错误，丢弃一个字节")
-                    buffer = buffer[1:]
-                    continue
-                if len(buffer) < 4 + length:
-                    break
-                body = buffer[4:4 + length]
+
+            for body in frames.frames_available():
                 points = handle_packet(body)
                 print(points)
                 gui_window.update_points(points)
-                buffer = buffer[4 + length:]
+            if frames.resync_count != resync_count:
+                print(f"帧头错误，共丢弃 {frames.resync_bytes} 字节")
+                resync_count = frames.resync_count
 
     from threading import Thread
     Thread(target=server_loop, daemon=True).start()
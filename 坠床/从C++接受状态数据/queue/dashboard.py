@@ -0,0 +1,217 @@
+# 多床位看板：每张床一个面板，平铺显示，右侧汇总所有处于坠床 / 真坠床状态的目标。
+# 每张床的跟踪程序连到自己的端口，一个 TargetStateServer 在同一个事件循环里监听所有端口，
+# 面板和报警按床位（本地端口）区分，跟踪程序断开重连后仍然落在同一个面板上，
+# 旧连接留下的报警在新连接的第一帧到达时按新数据重新计算；同一床位同时有多个连接时面板上列出各个对端地址。
+#
+# 服务器线程把各床位的最新一帧放进 LatestTargets；界面用一个共享的定时器按固定帧率取一次，
+# 只有这一拍收到了新数据（或者刚变成离线）的面板才重绘，其它面板不动。
+#
+# 用法：python dashboard.py [端口,端口,...] [显示帧率]
+import sys
+import time
+import math
+import numpy as np
+from PyQt5 import QtCore, QtWidgets, QtGui
+from recv import TargetDisplayWidget, LatestTargets, ACTION_INDEX
+from state_server import TargetStateServer
+
+ALARM_STATES = [ACTION_INDEX.index('坠床'), ACTION_INDEX.index('真坠床')]
+STALE_SECONDS = 2.0  # 超过这么久没有新帧，面板标记为离线
+
+
+class BedPanel(TargetDisplayWidget):
+    """一张床的面板：比例随面板大小自动缩放，有报警目标时画红框，离线时变灰"""
+
+    def __init__(self, source, parent=None):
+        super(BedPanel, self).__init__(parent)
+        self.title = source
+        self.alarm = False
+        self.stale = False
+        self.last_received = time.perf_counter()
+        self.peers = []  # 当前连在这张床上的跟踪程序（对端地址）
+        self.setMinimumSize(240, 200)
+
+    def set_targets(self, targets, frame_index=None, received_at=None):
+        super(BedPanel, self).set_targets(targets, frame_index, received_at)
+        self.alarm = bool(np.isin(targets['state'], ALARM_STATES).any())
+        self.stale = False
+        self.last_received = received_at if received_at is not None else time.perf_counter()
+
+    def resizeEvent(self, event):
+        # 整个显示范围放进面板，底部留 50 像素给 X 轴刻度
+        x_span = self.x_range[1] - self.x_range[0]
+        y_span = self.y_range[1] - self.y_range[0]
+        self.scale = max(min(self.width() / x_span, (self.height() - 60) / y_span), 1)
+        super(BedPanel, self).resizeEvent(event)
+
+    def paintEvent(self, event):
+        super(BedPanel, self).paintEvent(event)
+        if not (self.alarm or self.stale or len(self.peers) > 1):
+            return
+        painter = QtGui.QPainter(self)
+        if len(self.peers) > 1:
+            painter.setPen(QtCore.Qt.red)
+            painter.drawText(10, 45, f"{len(self.peers)} 个连接: {', '.join(self.peers)}")
+        if self.stale:
+            painter.fillRect(self.rect(), QtGui.QColor(128, 128, 128, 96))
+            painter.setPen(QtCore.Qt.black)
+            painter.drawText(self.width() - 60, 25, "离线")
+        if self.alarm:
+            painter.setPen(QtGui.QPen(QtCore.Qt.red, 6))
+            painter.setBrush(QtCore.Qt.NoBrush)
+            painter.drawRect(self.rect().adjusted(3, 3, -3, -3))
+
+
+class DashboardWindow(QtWidgets.QMainWindow):
+    def __init__(self, latest, fps=30, server=None):
+        super(DashboardWindow, self).__init__()
+        self.setWindowTitle("Bed Dashboard")
+        self.latest = latest
+        self.server = server  # 有的话从它的统计里取每张床当前的连接
+        self.panels = {}  # 床位 -> BedPanel
+        self.alarms = {}  # (床位, tid) -> (state, 开始时间)
+
+        self.grid = QtWidgets.QGridLayout()
+        self.grid.setSpacing(4)
+        panels_widget = QtWidgets.QWidget()
+        panels_widget.setLayout(self.grid)
+
+        self.alarm_list = QtWidgets.QListWidget()
+        self.alarm_list.setMinimumWidth(260)
+        alarm_layout = QtWidgets.QVBoxLayout()
+        alarm_layout.addWidget(QtWidgets.QLabel("报警"))
+        alarm_layout.addWidget(self.alarm_list)
+        alarm_widget = QtWidgets.QWidget()
+        alarm_widget.setLayout(alarm_layout)
+
+        splitter = QtWidgets.QSplitter()
+        splitter.addWidget(panels_widget)
+        splitter.addWidget(alarm_widget)
+        splitter.setStretchFactor(0, 1)
+        self.setCentralWidget(splitter)
+
+        self.status_label = QtWidgets.QLabel()
+        self.statusBar().addWidget(self.status_label)
+        self.repaints = 0
+
+        # 所有面板共用一个刷新节拍
+        self.tick_timer = QtCore.QTimer(self)
+        self.tick_timer.timeout.connect(self.tick)
+        self.tick_timer.start(max(1, 1000 // fps))
+        self.stats_timer = QtCore.QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(1000)
+
+    def panel(self, source):
+        """取床位对应的面板，第一次出现时新建并重新排布"""
+        panel = self.panels.get(source)
+        if panel is None:
+            panel = BedPanel(source)
+            self.panels[source] = panel
+            columns = math.ceil(math.sqrt(len(self.panels)))
+            for i, source_name in enumerate(sorted(self.panels)):
+                self.grid.addWidget(self.panels[source_name], i // columns, i % columns)
+        return panel
+
+    def tick(self):
+        now = time.perf_counter()
+        dirty = set()
+        for source, (frame_index, targets, received_at) in self.latest.take().items():
+            self.panel(source).set_targets(targets, frame_index, received_at)
+            dirty.add(source)
+        for source, panel in self.panels.items():
+            if not panel.stale and source not in dirty and now - panel.last_received > STALE_SECONDS:
+                panel.stale = True
+                dirty.add(source)
+
+        for source in dirty:
+            self.panels[source].update()
+        self.repaints += len(dirty)
+        if dirty:
+            self.update_alarms(dirty)
+
+    def update_alarms(self, sources):
+        """重新检查这些来源的报警目标，报警集合有变化时才重建列表"""
+        changed = False
+        for source in sources:
+            panel = self.panels[source]
+            if panel.stale:
+                continue  # 离线不代表报警解除，保留离线前的报警
+            targets = panel.targets
+            alarming = np.isin(targets['state'], ALARM_STATES)
+            current = {(source, tid): state
+                       for tid, state in zip(targets['tid'][alarming].tolist(), targets['state'][alarming].tolist())}
+            previous = {key: value[0] for key, value in self.alarms.items() if key[0] == source}
+            if current == previous:
+                continue
+            changed = True
+            for key in previous.keys() - current.keys():
+                del self.alarms[key]
+            for key, state in current.items():
+                if previous.get(key) != state:
+                    self.alarms[key] = (state, time.strftime('%H:%M:%S'))
+        if changed:
+            self.alarm_list.clear()
+            for (source, tid), (state, since) in sorted(self.alarms.items(), key=lambda item: item[1][1]):
+                item = QtWidgets.QListWidgetItem(f"{since}  {source}  目标 {tid}: {ACTION_INDEX[state]}")
+                item.setForeground(QtGui.QBrush(QtCore.Qt.red))
+                self.alarm_list.addItem(item)
+
+    def latency_summary(self):
+        """所有面板最近的接收到显示延迟（毫秒）"""
+        latencies = [latency for panel in self.panels.values() for latency in panel.latencies]
+        if not latencies:
+            return {}
+        latencies = np.array(latencies) * 1000
+        return {
+            'latency_p50': float(np.percentile(latencies, 50)),
+            'latency_p95': float(np.percentile(latencies, 95)),
+            'latency_max': float(latencies.max()),
+        }
+
+    def update_connections(self):
+        """按服务器最近一次的统计更新各床位的连接，有变化的面板重绘"""
+        peers = {}
+        for item in self.server.last_stats:
+            peers.setdefault(item['bed'], []).append(item['source'])
+        for bed, panel in self.panels.items():
+            current = sorted(peers.get(bed, []))
+            if current != panel.peers:
+                panel.peers = current
+                panel.update()
+
+    def update_stats(self):
+        if self.server is not None:
+            self.update_connections()
+        summary = self.latency_summary()
+        text = (f"{len(self.panels)} 张床, 报警 {len(self.alarms)}, 重绘 {self.repaints} 次/秒, "
+                f"收到 {self.latest.received} 帧, 合并 {self.latest.coalesced} 帧")
+        if summary:
+            text += f", 显示延迟 p50 {summary['latency_p50']:.1f} ms, p95 {summary['latency_p95']:.1f} ms"
+        self.status_label.setText(text)
+        self.repaints = 0
+
+
+def bed_name(port):
+    return f"床位 {port}"
+
+
+if __name__ == "__main__":
+    ports = [int(port) for port in sys.argv[1].split(',')] if len(sys.argv) > 1 else [7788]
+    fps = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    app = QtWidgets.QApplication(sys.argv)
+    latest = LatestTargets()
+
+    # targets 指向接收缓冲区，交给界面线程前复制一份
+    def on_frame(bed, frame_index, targets):
+        latest.put(bed, frame_index, targets.copy())
+
+    # 每张床一个端口，所有端口在同一个服务器（同一个事件循环）里
+    server = TargetStateServer('127.0.0.1', ports, on_frame=on_frame, frame_source='bed',
+                               bed_names={port: bed_name(port) for port in ports})
+    server.start()
+
+    window = DashboardWindow(latest, fps, server)
+    window.resize(1400, 900)
+    window.show()
+    sys.exit(app.exec_())
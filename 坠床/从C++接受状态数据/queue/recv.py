@@ -1,137 +1,138 @@
+import os
 import sys
-import socket
-import struct
+import time
 import threading
-import queue
+from collections import deque
+import numpy as np
 from PyQt5 import QtCore, QtWidgets, QtGui
 
-# 全局数据队列，服务器线程将接收到的数据放入队列中，GUI定时轮询数据
-data_queue = queue.Queue()
-
-def recv_exact(sock, size):
-    """确保接收指定长度的字节"""
-    data = b''
-    while len(data) < size:
-        packet = sock.recv(size - len(data))
-        if not packet:
-            return None
-        data += packet
-    return data
-
-def start_target_state_server(host='127.0.0.1', port=7788):
-    HEADER_SIZE = 8
-    TARGET_STRUCT_FMT = '<HHIffffffffff'
-    TARGET_STRUCT_SIZE = struct.calcsize(TARGET_STRUCT_FMT)
-
-    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    server_sock.bind((host, port))
-    server_sock.listen(3)
-    print(f"[Server] Listening on {host}:{port}...")
-
-    try:
-        while True:
-            print("[Server] Waiting for client connection...")
-            conn, addr = server_sock.accept()
-            print(f"[Server] Connected from {addr}")
-
-            try:
-                while True:
-                    header_data = recv_exact(conn, HEADER_SIZE)
-                    if not header_data:
-                        print("[Server] Client disconnected.")
-                        break
-
-                    frame_header, frame_index, total_len = struct.unpack('<H I H', header_data)
-                    if frame_header != 0xAA55:
-                        print(f"[Server] Invalid frame header: {hex(frame_header)}")
-                        continue
-
-                    body = recv_exact(conn, total_len)
-                    if not body:
-                        print("[Server] Body receive failed.")
-                        break
-
-                    target_num = body[0]
-                    targets = []
-                    offset = 1
-
-                    for i in range(target_num):
-                        target_data = body[offset : offset + TARGET_STRUCT_SIZE]
-                        if len(target_data) != TARGET_STRUCT_SIZE:
-                            print("[Server] Target data size mismatch.")
-                            break
-
-                        fields = struct.unpack(TARGET_STRUCT_FMT, target_data)
-                        target_info = {
-                            'tid': fields[0],
-                            'state': fields[1],
-                            'numPoints': fields[2],
-                            'posX': fields[3],
-                            'posY': fields[4],
-                            'posZ': fields[5],
-                            'velX': fields[6],
-                            'velY': fields[7],
-                            'velZ': fields[8],
-                            'accX': fields[9],
-                            'accY': fields[10],
-                            'accZ': fields[11],
-                        }
-                        targets.append(target_info)
-                        offset += TARGET_STRUCT_SIZE
-
-                    print(f"[Server] Frame #{frame_index}, targetNum={target_num}, targets={targets}")
-                    data_queue.put((frame_index, targets))
-
-            except Exception as e:
-                print(f"[Server] Client processing exception: {e}")
-            finally:
-                conn.close()
-                print("[Server] Client connection closed.")
-
-    except Exception as e:
-        print(f"[Server] Server exception: {e}")
-    finally:
-        server_sock.close()
-        print("[Server] Server socket closed.")
-
-
-def server_thread():
+# state_server.py 在上一级目录；追加到末尾，不会遮住标准库的 queue 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from state_server import TargetStateServer, TRACKER_TARGET_DTYPE, print_stats
+
+# 目标 state 字段对应的状态
+ACTION_INDEX = ['empty', '正常', '行走', '坐', '坠床', '真坠床', '出边界']
+
+class LatestTargets(QtCore.QObject):
+    """服务器线程和界面线程之间的交接：每个来源只保留最新一帧，
+    有新数据且界面还没取走时发一次 frame_ready 信号唤醒界面线程，界面来不及画的帧直接被覆盖"""
+    frame_ready = QtCore.pyqtSignal()
+
+    def __init__(self):
+        super(LatestTargets, self).__init__()
+        self._lock = threading.Lock()
+        self._latest = {}  # source -> (frame_index, targets, 接收时间 perf_counter)
+        self._pending = False
+        self.received = 0
+        # 每个来源没有显示就被覆盖掉的帧数：界面取走之前被同一来源的新帧覆盖，或者取走后界面没有显示（见 discard）
+        self.coalesced_by_source = {}
+
+    @property
+    def coalesced(self):
+        with self._lock:
+            return sum(self.coalesced_by_source.values())
+
+    def put(self, source, frame_index, targets):
+        """服务器线程调用"""
+        received_at = time.perf_counter()
+        with self._lock:
+            if source in self._latest:
+                self.coalesced_by_source[source] = self.coalesced_by_source.get(source, 0) + 1
+            self._latest[source] = (frame_index, targets, received_at)
+            self.received += 1
+            notify = not self._pending
+            self._pending = True
+        if notify:
+            self.frame_ready.emit()
+
+    def take(self):
+        """界面线程调用，取走各来源的最新一帧 {source: (frame_index, targets, received_at)}"""
+        with self._lock:
+            latest, self._latest = self._latest, {}
+            self._pending = False
+        return latest
+
+    def discard(self, sources):
+        """界面线程调用：take() 取走但没有显示的帧（每个来源一帧）也记为被覆盖"""
+        with self._lock:
+            for source in sources:
+                self.coalesced_by_source[source] = self.coalesced_by_source.get(source, 0) + 1
+
+
+def start_target_state_server(latest, host='127.0.0.1', port=7788):
+    # asyncio 服务端，每张床的跟踪程序一个连接，每一帧按来源放进 latest
+    # targets 指向接收缓冲区，交给界面线程前复制一份（整块内存复制，不逐个目标处理）
+    def on_frame(source, frame_index, targets):
+        latest.put(source, frame_index, targets.copy())
+
+    server = TargetStateServer(host, port, on_frame=on_frame, on_stats=print_stats, report_interval=5.0)
+    server.run()
+
+
+def server_thread(latest):
     """服务器线程入口函数"""
-    start_target_state_server()
+    start_target_state_server(latest)
 
 class TargetDisplayWidget(QtWidgets.QWidget):
     def __init__(self, parent=None):
         super(TargetDisplayWidget, self).__init__(parent)
-        self.targets = []
+        self.targets = np.empty(0, dtype=TRACKER_TARGET_DTYPE)
         self.scale = 100  # 1米 = 100像素，可调
         self.x_range = (-5, 5)  # x轴显示范围：-5m ~ 5m
         self.y_range = (0, 7)   # y轴显示范围：0 ~ 7m
-        self.__actionIndex = ['empty', '正常', '行走', '坐', '坠床', '真坠床', '出边界']
-
-    def update_targets(self, targets):
+        self.__actionIndex = ACTION_INDEX
+        self.title = ''  # 显示在帧序号前面，比如来源
+        self.frame_index = 0
+        self.received_at = None  # 当前这一帧的接收时间，画完后算一次接收到显示的延迟
+        self.latencies = deque(maxlen=1000)
+        self.title_font = QtGui.QFont("Arial", 12, QtGui.QFont.Bold)
+        self.label_font = QtGui.QFont("Arial", 10, QtGui.QFont.Bold)
+        self._grid = None  # 缓存的静态背景（白底、坐标轴、刻度），大小或显示范围变化后重建
+
+    def set_targets(self, targets, frame_index=None, received_at=None):
+        """更新数据但不重绘；targets：state_server.decode_targets 得到的结构化数组"""
         self.targets = targets
+        if frame_index is not None:
+            self.frame_index = frame_index
+        self.received_at = received_at
+
+    def update_targets(self, targets, frame_index=None, received_at=None):
+        self.set_targets(targets, frame_index, received_at)
         self.update()
 
-    def paintEvent(self, event):
-        painter = QtGui.QPainter(self)
-        painter.fillRect(self.rect(), QtCore.Qt.white)
-        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+    def set_range(self, x_range=None, y_range=None, scale=None):
+        """修改显示范围（米）或比例（像素/米）"""
+        if x_range is not None:
+            self.x_range = x_range
+        if y_range is not None:
+            self.y_range = y_range
+        if scale is not None:
+            self.scale = scale
+        self._grid = None
+        self.update()
 
-        # 绘制帧序号
-        painter.setPen(QtCore.Qt.black)
-        painter.setFont(QtGui.QFont("Arial", 12, QtGui.QFont.Bold))
-        painter.drawText(10, 25, f"Frame #{self.parent().frame_index}")
+    def resizeEvent(self, event):
+        self._grid = None
+        super(TargetDisplayWidget, self).resizeEvent(event)
 
+    def origin(self):
+        return self.width() / 2, self.height() - 50  # 原点在底部中间
+
+    def grid_pixmap(self):
+        """画出静态背景并缓存，之后每次重绘只贴这张图"""
+        if self._grid is not None:
+            return self._grid
         width = self.width()
         height = self.height()
+        ratio = self.devicePixelRatioF()
+        pixmap = QtGui.QPixmap(max(int(width * ratio), 1), max(int(height * ratio), 1))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(QtCore.Qt.white)
 
-        origin_x = width / 2
-        origin_y = height - 50  # 原点在底部中间
-
-        font = painter.font()
-        font.setPointSize(10)
-        painter.setFont(font)
+        painter = QtGui.QPainter(pixmap)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.setFont(self.label_font)
+        origin_x, origin_y = self.origin()
 
         # 坐标轴
         axis_pen = QtGui.QPen(QtCore.Qt.gray, 1, QtCore.Qt.DashLine)
@@ -151,32 +152,46 @@ class TargetDisplayWidget(QtWidgets.QWidget):
             painter.drawLine(int(origin_x - 5), int(y_pos), int(origin_x + 5), int(y_pos))
             if m != 0:
                 painter.drawText(int(origin_x + 8), int(y_pos + 5), f"{m}m")
+        painter.end()
 
-        # 绘制目标
-        # 绘制目标
-        if self.targets:
-            for target in self.targets:
-                x = target['posX']
-                y = target['posY']
-                draw_x = origin_x + x * self.scale
-                draw_y = origin_y - y * self.scale
-
-                radius = 8
-                painter.setBrush(QtCore.Qt.red)
-                painter.setPen(QtCore.Qt.NoPen)
-                painter.drawEllipse(QtCore.QPointF(draw_x, draw_y), radius, radius)
+        self._grid = pixmap
+        return pixmap
 
-                # 文本信息
-                painter.setPen(QtCore.Qt.black)
-                text1 = f"x:{x:.2f}, y:{y:.2f}, z:{target['posZ']:.2f}"
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.drawPixmap(0, 0, self.grid_pixmap())
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
 
-                state_index = target.get('state', 0)
+        # 绘制帧序号
+        painter.setPen(QtCore.Qt.black)
+        painter.setFont(self.title_font)
+        painter.drawText(10, 25, f"{self.title}  Frame #{self.frame_index}" if self.title else f"Frame #{self.frame_index}")
+        painter.setFont(self.label_font)
+
+        width = self.width()
+        height = self.height()
+        origin_x, origin_y = self.origin()
+
+        # 绘制目标：屏幕坐标按整列一次算出来，先画所有圆点再画所有文字，画笔只切换两次
+        if len(self.targets):
+            targets = self.targets
+            draw_xs = (origin_x + targets['posX'] * self.scale).tolist()
+            draw_ys = (origin_y - targets['posY'] * self.scale).tolist()
+            radius = 8
+            painter.setBrush(QtCore.Qt.red)
+            painter.setPen(QtCore.Qt.NoPen)
+            for draw_x, draw_y in zip(draw_xs, draw_ys):
+                painter.drawEllipse(QtCore.QPointF(draw_x, draw_y), radius, radius)
+
+            # 文本信息
+            painter.setPen(QtCore.Qt.black)
+            columns = zip(draw_xs, draw_ys, targets['posX'].tolist(), targets['posY'].tolist(),
+                          targets['posZ'].tolist(), targets['state'].tolist(), targets['velX'].tolist(),
+                          targets['velY'].tolist(), targets['velZ'].tolist())
+            for draw_x, draw_y, x, y, z, state_index, vx, vy, vz in columns:
+                text1 = f"x:{x:.2f}, y:{y:.2f}, z:{z:.2f}"
                 state_text = self.__actionIndex[state_index] if 0 <= state_index < len(self.__actionIndex) else "未知"
                 text2 = f"状态: {state_text}"
-
-                vx = target.get('velX', 0.0)
-                vy = target.get('velY', 0.0)
-                vz = target.get('velZ', 0.0)
                 text3 = f"vx:{vx:.2f}, vy:{vy:.2f}, vz:{vz:.2f}"
 
                 painter.drawText(int(draw_x + 10), int(draw_y), text1)
@@ -185,43 +200,74 @@ class TargetDisplayWidget(QtWidgets.QWidget):
 
         else:
             painter.setPen(QtCore.Qt.darkGray)
-            painter.drawText(width / 2 - 50, height / 2, "暂无目标")
+            painter.drawText(int(width / 2 - 50), int(height / 2), "暂无目标")
+
+        if self.received_at is not None:
+            self.latencies.append(time.perf_counter() - self.received_at)
+            self.received_at = None
+
+    def latency_summary(self):
+        """最近 1000 帧从收到数据到画完的延迟（毫秒）"""
+        if not self.latencies:
+            return {}
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'latency_p50': float(np.percentile(latencies, 50)),
+            'latency_p95': float(np.percentile(latencies, 95)),
+            'latency_max': float(latencies.max()),
+        }
 
 
 
 
 class MainWindow(QtWidgets.QMainWindow):
-    def __init__(self):
+    def __init__(self, latest):
         super(MainWindow, self).__init__()
         self.setWindowTitle("Target Display")
         self.display_widget = TargetDisplayWidget(self)
         self.setCentralWidget(self.display_widget)
         self.frame_index = 0  # 新增：保存当前帧序号
 
-        self.timer = QtCore.QTimer(self)
-        self.timer.timeout.connect(self.poll_queue)
-        self.timer.start(100)
-
-    def poll_queue(self):
-        """定时器回调，检查队列中是否有新数据"""
-        while not data_queue.empty():
-            try:
-                frame_index, targets = data_queue.get_nowait()
-                # print(targets)
-                self.frame_index = frame_index  # 保存帧序号
-                self.setWindowTitle(f"Target Display - Frame #{self.frame_index}")  # 更新标题
-                self.display_widget.update_targets(targets)
-            except queue.Empty:
-                break
+        # 有新数据时才由信号唤醒，不再定时轮询
+        self.latest = latest
+        self.latest.frame_ready.connect(self.on_frame_ready)
+
+        self.status_label = QtWidgets.QLabel()
+        self.statusBar().addWidget(self.status_label)
+        self.stats_timer = QtCore.QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(1000)
+
+    def on_frame_ready(self):
+        """显示最近收到的那一帧"""
+        latest = self.latest.take()
+        if not latest:
+            return
+        source, (frame_index, targets, received_at) = max(latest.items(), key=lambda item: item[1][2])
+        # 只显示最新的一个来源，其它来源的这一帧被它覆盖
+        self.latest.discard(other for other in latest if other != source)
+        self.frame_index = frame_index  # 保存帧序号
+        self.setWindowTitle(f"Target Display - {source} - Frame #{self.frame_index}")  # 更新标题
+        self.display_widget.update_targets(targets, frame_index, received_at)
+
+    def update_stats(self):
+        summary = self.display_widget.latency_summary()
+        text = f"收到 {self.latest.received} 帧, 合并 {self.latest.coalesced} 帧"
+        if summary:
+            text += (f", 显示延迟 p50 {summary['latency_p50']:.1f} ms, p95 {summary['latency_p95']:.1f} ms, "
+                     f"max {summary['latency_max']:.1f} ms")
+        self.status_label.setText(text)
 
 if __name__ == "__main__":
+    # 启动 PyQt 应用程序
+    app = QtWidgets.QApplication(sys.argv)
+    latest = LatestTargets()
+
     # 启动服务器线程（守护线程，退出时自动关闭）
-    t = threading.Thread(target=server_thread, daemon=True)
+    t = threading.Thread(target=server_thread, args=(latest,), daemon=True)
     t.start()
 
-    # 启动 PyQt 应用程序
-    app = QtWidgets.QApplication(sys.argv)
-    window = MainWindow()
+    window = MainWindow(latest)
     window.resize(800, 600)
     window.show()
     sys.exit(app.exec_())
@@ -1,81 +1,21 @@
-import socket
-import struct
+from state_server import TargetStateServer, LEGACY_FORMAT, print_stats
 
-def recv_exact(sock, size):
-    """确保接收指定长度的字节"""
-    data = b''
-    while len(data) < size:
-        packet = sock.recv(size - len(data))
-        if not packet:
-            return None
-        data += packet
-    return data
 
-def start_target_state_server(host='127.0.0.1', port=8899):
-    HEADER_SIZE = 4  # 2 bytes frame header + 2 bytes total length
-    TARGET_STRUCT_FMT = '<HHIfffffffff'  # 11个字段：2+2+4+9*4 = 46 bytes
-    TARGET_STRUCT_SIZE = struct.calcsize(TARGET_STRUCT_FMT)
-
-    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_sock.bind((host, port))
-    server_sock.listen(1)
-    print(f"[Server] Listening on {host}:{port}...")
+def print_frame(source, frame_index, targets):
+    print(f"[Server] {source} TargetNum: {len(targets)}")
+    for i in range(len(targets)):
+        target_info = {name: targets[name][i].item() for name in targets.dtype.names}
+        print(f"  Target {i}: {target_info}")
 
-    conn, addr = server_sock.accept()
-    print(f"[Server] Connected from {addr}")
 
+def start_target_state_server(host='127.0.0.1', port=8899):
+    # 帧头 2 bytes 0xAA55 + 2 bytes 数据长度，每个目标 2+2+4+9*4 = 46 bytes；可以同时接入多个连接
+    server = TargetStateServer(host, port, on_frame=print_frame, stream_format=LEGACY_FORMAT,
+                               on_stats=print_stats, report_interval=5.0)
     try:
-        while True:
-            header_data = recv_exact(conn, HEADER_SIZE)
-            if not header_data:
-                print("[Server] Connection closed.")
-                break
-
-            frame_header, total_len = struct.unpack('<HH', header_data)
-            if frame_header != 0xAA55:
-                print(f"[Server] Invalid frame header: {hex(frame_header)}")
-                continue
-
-            body = recv_exact(conn, total_len)
-            if not body:
-                print("[Server] Body receive failed.")
-                break
-
-            target_num = body[0]
-            print(f"[Server] TargetNum: {target_num}")
-            offset = 1
-
-            for i in range(target_num):
-                target_data = body[offset : offset + TARGET_STRUCT_SIZE]
-                if len(target_data) != TARGET_STRUCT_SIZE:
-                    print(f"[Server] Target data size mismatch.")
-                    break
-
-                fields = struct.unpack(TARGET_STRUCT_FMT, target_data)
-                target_info = {
-                    'tid': fields[0],
-                    'state': fields[1],
-                    'numPoints': fields[2],
-                    'posX': fields[3],
-                    'posY': fields[4],
-                    'posZ': fields[5],
-                    'velX': fields[6],
-                    'velY': fields[7],
-                    'velZ': fields[8],
-                    'accX': fields[9],
-                    'accY': fields[10],
-                    'accZ': fields[11],
-                }
-
-                print(f"  Target {i}: {target_info}")
-                offset += TARGET_STRUCT_SIZE
-
-    except Exception as e:
-        print(f"[Server] Exception: {e}")
-    finally:
-        conn.close()
-        server_sock.close()
-        print("[Server] Server closed.")
+        server.run()
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     start_target_state_server()
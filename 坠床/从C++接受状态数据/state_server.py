@@ -0,0 +1,267 @@
+# 接收 C++ 跟踪程序发来的目标状态数据流，asyncio 实现，可以同时接入多个连接（每张床一个跟踪程序）。
+#
+# 每个连接预先分配好帧头和数据体缓冲区，用 loop.sock_recv_into 直接读满（相当于 readexactly，但不产生新的 bytes），
+# 帧头不对时在已读到的字节里找下一个 0xAA55 重新同步，不会一直错位。
+# 可以同时监听多个端口（每张床一个端口），连接按所在的本地端口标上床位；跟踪程序重连后对端端口会变，床位不变。
+# 收到的每一帧连同来源交给 on_frame(source, frame_index, targets)，来源默认是对端地址，
+# frame_source='bed' 时是床位名称；日志和统计里始终带对端地址，同一床位上的多个连接可以区分开。
+# targets 是直接指向接收缓冲区的 NumPy 结构化数组（np.frombuffer，不逐个目标解析），只在回调期间有效，
+# 要留到回调之后用（比如放进队列给界面线程）需要 targets.copy()。
+# 每隔 report_interval 秒把各连接的帧率、积压字节数等统计交给 on_stats(stats)。
+import time
+import socket
+import struct
+import asyncio
+import threading
+from collections import namedtuple
+import numpy as np
+
+FRAME_HEADER = 0xAA55
+FRAME_MAGIC = struct.pack('<H', FRAME_HEADER)
+MAX_BODY_SIZE = 0xFFFF  # 数据长度字段是 uint16
+
+# 每个目标的字段，与 C++ 端的结构体一一对应（小端、无对齐填充）
+TARGET_FIELDS = [('tid', '<u2'), ('state', '<u2'), ('numPoints', '<u4'),
+                 ('posX', '<f4'), ('posY', '<f4'), ('posZ', '<f4'),
+                 ('velX', '<f4'), ('velY', '<f4'), ('velZ', '<f4'),
+                 ('accX', '<f4'), ('accY', '<f4'), ('accZ', '<f4')]
+# 3 个整数 + 9 个 float，即 '<HHIfffffffff'，46 bytes
+LEGACY_TARGET_DTYPE = np.dtype(TARGET_FIELDS)
+# 3 个整数 + 10 个 float（最后一个未使用），即 '<HHIffffffffff'，50 bytes
+TRACKER_TARGET_DTYPE = np.dtype(TARGET_FIELDS + [('reserved', '<f4')])
+
+# header：帧头结构，第一个字段是 0xAA55，最后一个字段是数据体长度；target：目标的 dtype；has_frame_index：帧头里是否带帧序号
+StreamFormat = namedtuple('StreamFormat', ['header', 'target', 'has_frame_index'])
+# queue/recv.py 使用的格式：帧头 0xAA55 + 帧序号(uint32) + 数据长度(uint16)
+TRACKER_FORMAT = StreamFormat(struct.Struct('<HIH'), TRACKER_TARGET_DTYPE, True)
+# recv_Data.py / main.py 使用的格式：帧头 0xAA55 + 数据长度(uint16)
+LEGACY_FORMAT = StreamFormat(struct.Struct('<HH'), LEGACY_TARGET_DTYPE, False)
+
+
+def decode_targets(body, dtype=TRACKER_TARGET_DTYPE):
+    """把数据体（1 字节目标个数 + 若干个目标结构）看成结构化数组，不复制数据；
+    按字段名取整列，如 targets['posX']。数据不完整时只返回完整的目标"""
+    if len(body) == 0:
+        return np.empty(0, dtype=dtype)
+    count = min(body[0], (len(body) - 1) // dtype.itemsize)
+    return np.frombuffer(body, dtype=dtype, count=count, offset=1)
+
+
+class TrackerConnection:
+    """一个跟踪程序连接的缓冲区和计数"""
+
+    def __init__(self, sock, addr, stream_format, bed=None):
+        self.sock = sock
+        self.source = f"{addr[0]}:{addr[1]}"
+        self.bed = bed
+        self.header = bytearray(stream_format.header.size)
+        self.body = bytearray(MAX_BODY_SIZE)
+        self.frames = 0
+        self.bytes_received = 0
+        self.bad_headers = 0
+        self.frame_index = 0
+        self.connected_at = time.time()
+        self._last_time = self.connected_at
+        self._last_frames = 0
+        self._last_bytes = 0
+
+
+class TargetStateServer:
+    def __init__(self, host='127.0.0.1', port=7788, on_frame=None, stream_format=TRACKER_FORMAT,
+                 on_stats=None, report_interval=1.0, frame_source='peer', bed_names=None):
+        self.host = host
+        self.ports = list(port) if isinstance(port, (list, tuple)) else [port]  # 可以传入多个端口
+        self.port = self.ports[0]
+        self.frame_source = frame_source  # 'peer'：on_frame 收到对端地址；'bed'：收到连接所在的床位
+        self.bed_names = bed_names or {}  # 本地端口 -> 床位名称，没有给出的用端口号
+        self.on_frame = on_frame
+        self.stream_format = stream_format
+        self.on_stats = on_stats
+        self.report_interval = report_interval
+        self.connections = {}
+        self.last_stats = []
+        self._peek = bytearray(MAX_BODY_SIZE)
+        self._loop = None
+        self._stop = None
+        self._ready = threading.Event()
+        self.error = None  # 后台线程里 serve() 抛出的异常（例如端口被占用）
+
+    def run(self):
+        """在当前线程里运行，直到 stop() 被调用"""
+        try:
+            asyncio.run(self.serve())
+        finally:
+            self._ready.set()  # 监听失败时也要唤醒 start()
+
+    def _run_background(self):
+        try:
+            self.run()
+        except Exception as e:
+            self.error = e
+
+    def start(self):
+        """在后台守护线程里运行，返回该线程；监听失败时在调用方线程里抛出原来的异常"""
+        thread = threading.Thread(target=self._run_background, name='target-state-server', daemon=True)
+        thread.start()
+        self._ready.wait()
+        if self.error is not None:
+            raise self.error
+        return thread
+
+    def stop(self):
+        """可以在任意线程里调用"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        listeners = []
+        try:
+            for port in self.ports:
+                listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                listeners.append(listener)
+                listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                listener.bind((self.host, port))
+                listener.listen(16)
+                listener.setblocking(False)
+        except OSError:
+            for listener in listeners:
+                listener.close()
+            raise
+        # port 为 0 时取系统分配的端口
+        self.ports = [listener.getsockname()[1] for listener in listeners]
+        self.port = self.ports[0]
+        print(f"[Server] Listening on {self.host}:{','.join(map(str, self.ports))}...")
+        self._ready.set()
+
+        handlers = set()
+        accept_tasks = [asyncio.create_task(self._accept_loop(listener, handlers)) for listener in listeners]
+        report_task = asyncio.create_task(self._report_loop())
+        try:
+            await self._stop.wait()
+        finally:
+            for task in accept_tasks:
+                task.cancel()
+            report_task.cancel()
+            for task in list(handlers):
+                task.cancel()
+            await asyncio.gather(*accept_tasks, report_task, *handlers, return_exceptions=True)
+            for listener in listeners:
+                listener.close()
+            print("[Server] Server socket closed.")
+
+    def bed_name(self, port):
+        return self.bed_names.get(port, str(port))
+
+    async def _accept_loop(self, listener, handlers):
+        while True:
+            sock, addr = await self._loop.sock_accept(listener)
+            sock.setblocking(False)
+            connection = TrackerConnection(sock, addr, self.stream_format, self.bed_name(sock.getsockname()[1]))
+            print(f"[Server] Connected from {connection.source} -> {connection.bed}")
+            task = asyncio.create_task(self._handle(connection))
+            handlers.add(task)
+            task.add_done_callback(handlers.discard)
+
+    async def _recv_exact(self, connection, view):
+        """把 view 读满，连接断开时返回 False"""
+        received = 0
+        while received < len(view):
+            n = await self._loop.sock_recv_into(connection.sock, view[received:])
+            if n == 0:
+                return False
+            received += n
+        connection.bytes_received += received
+        return True
+
+    async def _read_header(self, connection):
+        """读一个帧头，帧头不对时从下一个 0xAA55 处重新对齐；连接断开时返回 None"""
+        header = connection.header
+        view = memoryview(header)
+        size = len(header)
+        have = 0
+        while True:
+            if not await self._recv_exact(connection, view[have:]):
+                return None
+            if header[:2] == FRAME_MAGIC:
+                return self.stream_format.header.unpack(header)
+            connection.bad_headers += 1
+            pos = header.find(FRAME_MAGIC, 1)
+            if pos < 0:
+                # 最后一个字节可能是下一个帧头的前半个
+                pos = size - 1 if header[-1] == FRAME_MAGIC[0] else size
+            header[:size - pos] = header[pos:]
+            have = size - pos
+
+    async def _handle(self, connection):
+        self.connections[connection.source] = connection
+        body_view = memoryview(connection.body)
+        frame_source = connection.bed if self.frame_source == 'bed' else connection.source
+        try:
+            while True:
+                fields = await self._read_header(connection)
+                if fields is None:
+                    print(f"[Server] {connection.source} disconnected.")
+                    break
+                total_len = fields[-1]
+                if not await self._recv_exact(connection, body_view[:total_len]):
+                    print(f"[Server] {connection.source} body receive failed.")
+                    break
+                if self.stream_format.has_frame_index:
+                    connection.frame_index = fields[1]
+                else:
+                    connection.frame_index += 1
+                connection.frames += 1
+                targets = decode_targets(body_view[:total_len], self.stream_format.target)
+                if self.on_frame is not None:
+                    self.on_frame(frame_source, connection.frame_index, targets)
+        except (ConnectionError, OSError) as e:
+            print(f"[Server] {connection.source} connection error: {e}")
+        finally:
+            connection.sock.close()
+            del self.connections[connection.source]
+
+    def backlog(self, connection):
+        """已经到达本机但还没读取的字节数（最多统计到 MAX_BODY_SIZE）"""
+        try:
+            return connection.sock.recv_into(self._peek, len(self._peek), socket.MSG_PEEK)
+        except (BlockingIOError, InterruptedError):
+            return 0
+        except OSError:
+            return -1
+
+    def stats(self):
+        """各连接的统计，只能在事件循环线程里调用（on_stats 里拿到的就是它的结果）"""
+        now = time.time()
+        stats = []
+        for connection in self.connections.values():
+            elapsed = max(now - connection._last_time, 1e-6)
+            stats.append({
+                'source': connection.source,
+                'bed': connection.bed,
+                'frame_index': connection.frame_index,
+                'frames': connection.frames,
+                'fps': (connection.frames - connection._last_frames) / elapsed,
+                'bytes_per_sec': (connection.bytes_received - connection._last_bytes) / elapsed,
+                'bad_headers': connection.bad_headers,
+                'backlog': self.backlog(connection),
+            })
+            connection._last_frames = connection.frames
+            connection._last_bytes = connection.bytes_received
+            connection._last_time = now
+        return stats
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.last_stats = self.stats()
+            if self.on_stats is not None:
+                self.on_stats(self.last_stats)
+
+
+def print_stats(stats):
+    for item in stats:
+        print(f"[Server] {item['source']} -> {item['bed']}: Frame #{item['frame_index']}, {item['fps']:.1f} fps, "
+              f"{item['bytes_per_sec'] / 1024:.1f} KB/s, backlog {item['backlog']} B, "
+              f"bad headers {item['bad_headers']}")
@@ -1,113 +1,187 @@
-import serial
+# 串口 → TCP 转发：把雷达点云逐帧转成二进制包发给 C++ 跟踪程序。
+#
+# 读线程只负责读串口、切行、解析、打包，放进有界队列；发送线程从队列取包发出去，
+# 队列里已经积压的几帧合并成一次 sendall。两边互不等待：
+#   - 连接断开、重连期间读线程照常读串口，队列满了丢最旧的帧（跟踪程序要的是最新状态）并计数
+#   - 重连在发送线程里进行，不会让串口缓冲区堆积
+# 包格式：包头 帧索引 (uint32), 点数 (uint32)；包体：每个点 5 个 int16
+# serial_port 为 hub://host:port 时从 serial_hub.py 订阅已经解析好的帧，串口可以同时给录制、显示等程序用。
+import os
+import sys
+import time
 import socket
 import struct
-import time
+import threading
+import serial
+import numpy as np
 
-def main(serial_port, tcp_ip, tcp_port, max_retries=5, retry_delay=5):
-    # 初始化串口
-    ser = serial.Serial(
-        port=serial_port,
-        baudrate=921600,  # 根据雷达实际波特率调整
-        timeout=2
-    )
-
-    # 初始化 TCP 客户端
-    tcp_socket = None
-    retries = 0
-
-    # 尝试连接到 TCP 服务器
-    def connect_to_server():
-        nonlocal retries, tcp_socket
-        retries = 0
-        while retries < max_retries:
-            try:
-                tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                tcp_socket.connect((tcp_ip, tcp_port))
-                print(f"成功连接到 {tcp_ip}:{tcp_port}")
-                retries = 0  # 重置重试次数
-                return True
-            except Exception as e:
-                print(f"TCP 连接失败: {e}")
-                retries += 1
-                if retries < max_retries:
-                    print(f"尝试重新连接... ({retries}/{max_retries})")
-                    time.sleep(retry_delay)  # 等待一段时间后重试
-                else:
-                    print("达到最大重试次数，暂时无法连接到服务器")
-                    return False
-
-    # 初始连接
-    if not connect_to_server():
-        return  # 如果初始连接失败，退出程序
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'origin_data_to_csv'))
+from radar_parser import ParseStats, SerialLineReader, parse_line
+from serial_hub import HUB_SCHEME, HubClient
+from packet_io import PacketQueue
 
-    try:
-        while True:
-            # 读取一行数据（假设以换行符结尾）
-            line = ser.readline().decode('ascii', errors='ignore').strip()
-            print(line)
-            if not line:
-                continue
-
-            # 分割数据字段
-            parts = line.split(',')
-            if len(parts) < 2:
-                continue
+PACKET_HEADER = struct.Struct('<II')
+
+
+def encode_packet(frame_index, points):
+    return PACKET_HEADER.pack(frame_index, len(points)) + np.ascontiguousarray(points, dtype='<i2').tobytes()
+
+
+class SerialTcpBridge:
+    def __init__(self, serial_port, tcp_ip, tcp_port, baud_rate=921600, queue_size=256, max_batch=8,
+                 retry_delay=2, connect_timeout=2, send_timeout=5, send_buffer=256 * 1024):
+        self.serial_port = serial_port
+        self.baud_rate = baud_rate  # 根据雷达实际波特率调整
+        self.address = (tcp_ip, tcp_port)
+        self.retry_delay = retry_delay
+        self.connect_timeout = connect_timeout
+        self.send_timeout = send_timeout  # 跟踪程序卡住不收数据时，超过这么久算发送失败，断开重连
+        self.send_buffer = send_buffer
 
+        self.packets = PacketQueue(queue_size, max_batch)  # max_batch：一次 sendall 最多合并的帧数
+        self.parse_stats = ParseStats()
+        self.bytes_received = 0
+        self.garbage_bytes = 0
+        self.connects = 0
+        self.connected = False
+        self.error = None
+
+        self._serial = None
+        self._sock = None
+        self._threads = []
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if self.serial_port.startswith(HUB_SCHEME):
+            reader = threading.Thread(target=self._hub_loop, name='hub-subscriber', daemon=True)
+        else:
+            # 在调用方线程里打开串口，打不开时直接抛异常
+            self._serial = serial.Serial(port=self.serial_port, baudrate=self.baud_rate, timeout=0.1)
+            reader = threading.Thread(target=self._read_loop, name='serial-reader', daemon=True)
+        self._threads = [
+            reader,
+            threading.Thread(target=self._send_loop, name='tcp-sender', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        sock = self._sock
+        if sock is not None:
             try:
-                # 解析帧头和点数
-                frame_index = int(parts[0])
-                point_num = int(parts[1])
-                expected_length = 2 + 5 * point_num - 1
+                sock.shutdown(socket.SHUT_RDWR)  # 让卡在 sendall 里的发送线程立即退出
+            except OSError:
+                pass
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._serial is not None:
+            self._serial.close()
+            self._serial = None
+
+    def _read_loop(self):
+        reader = SerialLineReader(self._serial)
+        try:
+            while not self._stop_event.is_set():
+                _, lines = reader.read_lines()
+                self.bytes_received = reader.bytes_received
+                self.garbage_bytes = reader.garbage_bytes
+                for line in lines:
+                    parsed = parse_line(line, self.parse_stats)
+                    if parsed is not None:
+                        self.packets.put(encode_packet(*parsed))
+        except Exception as e:
+            self.error = e
+            self._stop_event.set()
+
+    def _hub_loop(self):
+        client = HubClient(self.serial_port, stop_event=self._stop_event)
+        try:
+            for _, frame_index, points in client.frames():
+                self.bytes_received = client.bytes_received
+                self.parse_stats.frames += 1
+                self.parse_stats.points += len(points)
+                self.packets.put(encode_packet(frame_index, points))
+            if not self._stop_event.is_set():
+                raise ConnectionError('serial_hub 断开')
+        except Exception as e:
+            self.error = e
+            self._stop_event.set()
 
-                # 构建二进制数据包
+    def _connect(self):
+        try:
+            sock = socket.create_connection(self.address, timeout=self.connect_timeout)
+        except OSError as e:
+            print(f"TCP 连接失败: {e}，{self.retry_delay} 秒后重试")
+            return None
+        sock.settimeout(self.send_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+        self.connects += 1
+        print(f"成功连接到 {self.address[0]}:{self.address[1]}")
+        return sock
+
+    def _send_loop(self):
+        sock = None
+        try:
+            while not self._stop_event.is_set():
+                if sock is None:
+                    sock = self._connect()
+                    self._sock = sock
+                    self.connected = sock is not None
+                    if sock is None:
+                        self._stop_event.wait(self.retry_delay)
+                        continue
+
+                # 队列里已经到达的帧一起发，不额外等待；发送失败的那一批计入 frames_lost
                 try:
-                    # 包头：帧索引 (uint32), 点数 (uint32)
-                    header = struct.pack('<II', frame_index, point_num)
-
-                    # 包体：每个点的数据 (5 个 int16)
-                    points_data = bytearray()
-                    for i in range(point_num):
-                        base = 2 + i * 5
-                        try:
-                            x = int(parts[base])
-                            y = int(parts[base + 1])
-                            z = int(parts[base + 2])
-                            vel = int(parts[base + 3])
-                            snr = int(parts[base + 4])
-                            points_data += struct.pack('<5h', x, y, z, vel, snr)
-                        except (ValueError, IndexError) as e:
-                            print(f"解析点云数据时出错（点 {i}）: {e}")
-                            print(f"数据字段: {parts[base:base + 5]}")
-                            break  # 如果某个点解析失败，终止整个数据包的构建
-
-                    # 如果成功构建了数据包，则发送
-                    if len(points_data) == point_num * 10:  # 每个点占用 10 字节 (5 * int16)
-                        while True:
-                            try:
-                                tcp_socket.sendall(header + points_data)
-                                break  # 发送成功，退出循环
-                            except Exception as e:
-                                print(f"发送数据失败: {e}")
-                                print("尝试重新连接...")
-                                if not connect_to_server():
-                                    print("无法重新连接到服务器，跳过当前数据包")
-                                    break  # 无法重新连接，跳过当前数据包
-                    else:
-                        print("数据包不完整，跳过发送")
-                except Exception as e:
-                    print(f"数据包构建失败: {e}")
-
-            except ValueError as e:
-                print(f"数据解析错误: {e}")
-                continue
+                    self.packets.send_batch(sock)
+                except OSError as e:
+                    print(f"发送数据失败: {e}，尝试重新连接...")
+                    sock.close()
+                    sock = self._sock = None
+                    self.connected = False
+        finally:
+            self._sock = None
+            if sock is not None:
+                sock.close()
+            self.connected = False
+
+    def stats(self):
+        return {
+            'bytes_received': self.bytes_received,
+            'garbage_bytes': self.garbage_bytes,
+            'frames_parsed': self.parse_stats.frames,
+            'parse_errors': self.parse_stats.malformed,
+            'queue_size': self.packets.qsize(),
+            'frames_queued': self.packets.queued,
+            'frames_dropped': self.packets.dropped,
+            'frames_lost': self.packets.lost,
+            'frames_sent': self.packets.sent,
+            'bytes_sent': self.packets.bytes_sent,
+            'frames_per_send': self.packets.sent / max(self.packets.sends, 1),
+            'connects': self.connects,
+            'connected': self.connected,
+        }
 
+
+def main(serial_port, tcp_ip, tcp_port, status_interval=5, **options):
+    bridge = SerialTcpBridge(serial_port, tcp_ip, tcp_port, **options)
+    bridge.start()
+    try:
+        while bridge.error is None:
+            time.sleep(status_interval)
+            print(bridge.stats())
+        print(f"读取串口出错: {bridge.error}")
     except KeyboardInterrupt:
         print("用户中断")
     finally:
-        ser.close()
-        if tcp_socket:
-            tcp_socket.close()
+        bridge.stop()
+        print(f"解析统计: {bridge.parse_stats.as_dict()}")
+        print(bridge.stats())
 
 
 if __name__ == "__main__":
-    main('COM30', '127.0.0.1', 7777, max_retries=3, retry_delay=2)
\ No newline at end of file
+    # 可以传入串口名，或者 hub://127.0.0.1:7790 与其它程序共用 serial_hub.py 打开的串口
+    main(sys.argv[1] if len(sys.argv) > 1 else 'COM30', '127.0.0.1', 7777, retry_delay=2)